@@ -0,0 +1,173 @@
+"""
+End-to-end orchestrator benchmark against the local fake server.
+
+Runs `src/main.py` for N synthetic features x M polish phases and reports wall time,
+HTTP calls per endpoint, CPU time and peak memory. The workspace is a clone of a local bare
+origin that the fake agents push their branches to, so merges (--parallel, --fanout,
+--parallel-polish) and the local branch checks run for real. Save a run with --json and compare
+later runs against it with --baseline.
+
+    python benchmarks/bench_orchestrator.py --features 4 --polish 2 -- --parallel 4
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+import resource
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+
+from fake_server import FakeConfig, GIT_IDENTITY, start_fake_server
+
+MAIN_PATH = os.path.join(os.path.dirname(BENCH_DIR), "src", "main.py")
+POLISH_PHASES = ["logs", "errors", "hinting", "tests"]
+
+SPEC_TEMPLATE = "# Feature Specification: {name}\n\n## Requirements\n- **FR-001**: The system MUST do {name}.\n"
+PLAN_TEMPLATE = "# Implementation Plan: {name}\n\n## Summary\nImplement {name} in src/{name}.py.\n"
+TASKS_TEMPLATE = """# Tasks: {name}
+
+## Phase 1: Setup
+
+- [ ] T001 [P] Create src/{name}/__init__.py
+- [ ] T002 [P] Create src/{name}/config.py
+
+## Phase 2: Core
+
+- [ ] T003 Implement {name} in src/{name}/core.py
+"""
+
+def create_workspace(root, features, polish):
+    """Write N synthetic features and a state.json where only the first M polish phases are pending."""
+    for i in range(features):
+        name = f"{i+1:03d}-bench-feature"
+        feature_dir = os.path.join(root, "specs", name)
+        os.makedirs(feature_dir)
+        for filename, template in (("spec.md", SPEC_TEMPLATE), ("plan.md", PLAN_TEMPLATE), ("tasks.md", TASKS_TEMPLATE)):
+            with open(os.path.join(feature_dir, filename), 'w') as f:
+                f.write(template.format(name=name))
+
+    state = {
+        "last_successful_branch": "main",
+        "current_phase": "features",
+        "features": {},
+        "polish": {p: {"status": "pending" if i < polish else "completed"} for i, p in enumerate(POLISH_PHASES)}
+    }
+    with open(os.path.join(root, "state.json"), 'w') as f:
+        json.dump(state, f)
+
+def create_repository(root, features, polish):
+    """
+    Create a bare origin in root/origin.git and a workspace clone in root/workspace holding the
+    synthetic specs on main (state.json stays untracked). Returns (workspace, origin).
+    """
+    origin, workspace = os.path.join(root, "origin.git"), os.path.join(root, "workspace")
+    env = dict(os.environ, **GIT_IDENTITY)
+    def git(*args, cwd=root):
+        subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True)
+    git("init", "--quiet", "--bare", "--initial-branch=main", origin)
+    git("clone", "--quiet", origin, workspace)
+    create_workspace(workspace, features, polish)
+    git("add", "specs", cwd=workspace)
+    git("commit", "--quiet", "-m", "Add synthetic specs", cwd=workspace)
+    git("push", "--quiet", "origin", "main", cwd=workspace)
+    return workspace, origin
+
+def run_once(args, extra_args):
+    """Run the orchestrator once against a fresh fake server and return its measurements."""
+    root = tempfile.TemporaryDirectory()
+    workspace, origin = create_repository(root.name, args.features, args.polish)
+    config = FakeConfig(args.agent_duration, args.latency, args.error_rate, verify_fail_rate=args.verify_fail_rate, seed=args.seed, origin=origin)
+    server = start_fake_server(config)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    env = dict(os.environ, **GIT_IDENTITY)
+    env.update({
+        "CURSOR_API_URL": f"{base_url}/v0/agents",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "CURSOR_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "GITHUB_REPO_URL": "https://github.com/example/bench",
+    })
+
+    with root:
+        usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, MAIN_PATH] + extra_args, cwd=workspace, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - started
+        usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        server.shutdown()
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        raise SystemExit(f"Orchestrator exited with code {result.returncode}")
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    return {
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "max_rss_mb": usage_after.ru_maxrss / 1024,  # ru_maxrss is KiB on Linux
+        "http_calls": sum(c for e, c in server.calls.items() if not e.startswith(("error_", "webhook", "git"))),
+        "calls": dict(server.calls),
+    }
+
+def summarize(runs):
+    """Average the numeric measurements of several runs."""
+    summary = {key: sum(r[key] for r in runs) / len(runs) for key in ("wall_seconds", "cpu_seconds", "max_rss_mb", "http_calls")}
+    endpoints = sorted({e for r in runs for e in r["calls"]})
+    summary["calls"] = {e: sum(r["calls"].get(e, 0) for r in runs) / len(runs) for e in endpoints}
+    return summary
+
+def print_report(summary, baseline=None):
+    rows = [
+        ("Wall time (s)", "wall_seconds", "{:.2f}"),
+        ("CPU time (s)", "cpu_seconds", "{:.2f}"),
+        ("Peak RSS (MB)", "max_rss_mb", "{:.1f}"),
+        ("HTTP calls", "http_calls", "{:.0f}"),
+    ]
+    for label, key, fmt in rows:
+        line = f"{label:<16} {fmt.format(summary[key]):>10}"
+        if baseline and baseline.get(key):
+            change = (summary[key] - baseline[key]) / baseline[key]
+            line += f"   (baseline {fmt.format(baseline[key])}, {change:+.1%})"
+        print(line)
+    print("Calls by endpoint:")
+    for endpoint, calls in summary["calls"].items():
+        print(f"  {endpoint:<24} {calls:.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Orchestrator benchmark against the local fake server",
+                                     epilog="Arguments after '--' are passed to src/main.py (e.g. -- --parallel 4)")
+    parser.add_argument("--features", type=int, default=3, help="Number of synthetic features (N)")
+    parser.add_argument("--polish", type=int, default=4, choices=range(0, 5), help="Number of polish phases to run (M)")
+    parser.add_argument("--agent-duration", type=float, default=3.0, help="Seconds each fake agent runs")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/5xx")
+    parser.add_argument("--verify-fail-rate", type=float, default=0.0, help="Fraction of verifications answered 'fail'")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for failure injection")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs to average")
+    parser.add_argument("--json", metavar="PATH", help="Write the summary as JSON (use as a future --baseline)")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a summary saved with --json")
+    args, extra = parser.parse_known_args()
+    extra_args = [a for a in extra if a != "--"]
+
+    print(f"Benchmark: {args.features} features x {args.polish} polish phases, agent duration {args.agent_duration}s, "
+          f"main.py args: {shlex.join(extra_args) or '(none)'}")
+    summary = summarize([run_once(args, extra_args) for _ in range(args.repeat)])
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
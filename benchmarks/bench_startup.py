@@ -0,0 +1,99 @@
+"""
+CLI startup regression check.
+
+Times `src/main.py` commands that should return without touching the network (--help, the
+status commands, --dry-run and --plan) on a synthetic workspace, and reports their cost over a
+bare interpreter start. Fails when a command goes over its budget or imports a module it should
+not load (the OpenAI and HTTP clients, asyncio and .env loading for the read-only commands).
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import os
+import re
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+
+from bench_orchestrator import MAIN_PATH, create_workspace
+
+NETWORK_MODULES = ["openai", "requests"]
+STATUS_MODULES = NETWORK_MODULES + ["asyncio", "multiprocessing"]
+
+# (command args, budget in ms over a bare interpreter start, modules that must not be imported)
+COMMANDS = [
+    (["--help"], 100, STATUS_MODULES + ["dotenv"]),
+    (["specs"], 100, STATUS_MODULES + ["dotenv"]),
+    (["specs", "stats"], 100, STATUS_MODULES + ["dotenv"]),
+    (["history"], 100, STATUS_MODULES),
+    (["jobs"], 150, STATUS_MODULES),
+    (["--dry-run"], 100, STATUS_MODULES + ["dotenv"]),
+    (["--plan"], 100, STATUS_MODULES + ["dotenv"]),
+]
+
+# 'jobs' exits 1 because no daemon is listening
+EXPECTED_EXIT = {"jobs": 1}
+
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+\d+ \| +([\w.]+)$")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def best_time(cmd, cwd, env, repeat):
+    """Fastest of `repeat` runs in milliseconds, and the exit code of the last run."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times), result.returncode
+
+def imported_modules(cmd, cwd, env):
+    """Top-level package names a run imports, from -X importtime."""
+    result = subprocess.run([cmd[0], "-X", "importtime"] + cmd[1:], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return {m.group(1).split(".")[0] for m in map(IMPORT_LINE.match, result.stderr.splitlines()) if m}
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup time and import budget check")
+    parser.add_argument("--features", type=int, default=20, help="Number of synthetic features in the workspace")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command; the fastest one counts")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget (for slow machines)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    for name in ("GITHUB_REPO_URL", "CURSOR_API_KEY", "OPENAI_API_KEY"):
+        env.pop(name, None)  # --dry-run must not need them
+    env["ORCHESTRATOR_DAEMON_PORT"] = str(free_port())  # 'jobs' with no daemon listening
+
+    failures = []
+    with tempfile.TemporaryDirectory() as root:
+        create_workspace(root, args.features, 4)
+        env["ORCHESTRATOR_HISTORY_DB"] = os.path.join(root, "history.db")
+        interpreter, _ = best_time([sys.executable, "-c", "pass"], root, env, args.repeat)
+        print(f"Bare interpreter start: {interpreter:.0f} ms ({args.features} features, best of {args.repeat})")
+        print(f"{'COMMAND':<16} {'TOTAL':>8} {'OVER':>8} {'BUDGET':>8}  RESULT")
+
+        for command, budget, forbidden in COMMANDS:
+            cmd = [sys.executable, MAIN_PATH] + command
+            total, exit_code = best_time(cmd, root, env, args.repeat)
+            budget *= args.budget_scale
+            loaded = sorted(set(forbidden) & imported_modules(cmd, root, env))
+            problems = ([f"{total - interpreter:.0f} ms over budget"] if total - interpreter > budget else []) + \
+                       ([f"imports {', '.join(loaded)}"] if loaded else []) + \
+                       ([f"exit code {exit_code}"] if exit_code != EXPECTED_EXIT.get(command[0], 0) else [])
+            print(f"{' '.join(command):<16} {total:>6.0f}ms {total - interpreter:>6.0f}ms {budget:>6.0f}ms  {'; '.join(problems) or 'ok'}")
+            failures += [f"{' '.join(command)}: {p}" for p in problems]
+
+    if failures:
+        raise SystemExit("Startup budget exceeded:\n  " + "\n  ".join(failures))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Local stand-in for the Cursor Cloud Agents API and the OpenAI chat-completions endpoint.
+
+Point the orchestrator at it with:
+    CURSOR_API_URL=http://127.0.0.1:8765/v0/agents
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+
+Agents launched with a "webhook" block ({"url", "secret"}) receive signed statusChange
+callbacks when they start running and when they end, like the real API sends.
+
+With an origin (a bare git repository), each launch and follow-up also pushes a commit to the
+agent's cursor/<id> branch that adds a file and marks the tasks of the prompt's feature done, so
+merges and branch checks have real branches to work on.
+"""
+import os
+import hmac
+import json
+import hashlib
+import time
+import uuid
+import random
+import argparse
+import subprocess
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeConfig:
+    """Behaviour knobs for the fake server."""
+
+    def __init__(self, agent_duration=3.0, latency=0.0, error_rate=0.0, error_codes=(429, 502, 503),
+                 agent_fail_rate=0.0, verify_fail_rate=0.0, seed=None, origin=None):
+        self.agent_duration = agent_duration  # seconds from launch (or follow-up) to FINISHED
+        self.latency = latency  # seconds added to every response
+        self.error_rate = error_rate  # fraction of requests answered with one of error_codes
+        self.error_codes = error_codes
+        self.agent_fail_rate = agent_fail_rate  # fraction of agents that end FAILED instead of FINISHED
+        self.verify_fail_rate = verify_fail_rate  # fraction of verifications answered "fail"
+        self.random = random.Random(seed)
+        self.origin = origin  # bare repository agents push their branches to, or None
+
+GIT_IDENTITY = {"GIT_AUTHOR_NAME": "Fake Agent", "GIT_AUTHOR_EMAIL": "agent@example.com",
+                "GIT_COMMITTER_NAME": "Fake Agent", "GIT_COMMITTER_EMAIL": "agent@example.com"}
+
+def git(origin, *args, stdin=None, env=None):
+    return subprocess.run(["git", "--git-dir", origin, *args], input=stdin, env=env, capture_output=True, text=True, check=True).stdout.strip()
+
+def push_agent_commit(origin, agent_id, parent_ref, prompt="", followup=False):
+    """
+    Commit agents/<id>.txt on top of parent_ref in the bare origin as cursor/<id>, without a checkout,
+    marking done every task of the features whose name appears in the prompt.
+    """
+    parent = git(origin, "rev-parse", f"refs/heads/{parent_ref}")
+    env = dict(os.environ, GIT_INDEX_FILE=os.path.join(origin, f"index-{agent_id}"), **GIT_IDENTITY)
+    try:
+        git(origin, "read-tree", parent, env=env)
+        note_path = f"agents/{agent_id}.txt"
+        previous = git(origin, "cat-file", "-p", f"{parent}:{note_path}") + "\n" if followup else ""
+        updates = {note_path: previous + f"Work by {agent_id}\n"}
+        for path in git(origin, "ls-tree", "-r", "--name-only", parent, "specs").splitlines():
+            if path.endswith("/tasks.md") and path.split("/")[-2] in prompt:
+                updates[path] = git(origin, "cat-file", "-p", f"{parent}:{path}").replace("- [ ]", "- [X]") + "\n"
+        for path, content in updates.items():
+            blob = git(origin, "hash-object", "-w", "--stdin", stdin=content)
+            git(origin, "update-index", "--add", "--cacheinfo", f"100644,{blob},{path}", env=env)
+        tree = git(origin, "write-tree", env=env)
+        commit = git(origin, "commit-tree", tree, "-p", parent, "-m", f"Work by {agent_id}", env=env)
+        git(origin, "update-ref", f"refs/heads/cursor/{agent_id}", commit)
+    finally:
+        if os.path.exists(env["GIT_INDEX_FILE"]):
+            os.remove(env["GIT_INDEX_FILE"])
+
+class FakeCursorServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the fake agents and per-endpoint call counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeHandler)
+        self.config = config
+        self.agents = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.git_lock = threading.Lock()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def push_work(self, agent, followup=False):
+        """Push the agent's commit to the origin, when one is configured."""
+        if not self.config.origin:
+            return
+        parent = f"cursor/{agent['id']}" if followup else agent["source"].get("ref", "main")
+        with self.git_lock:
+            push_agent_commit(self.config.origin, agent["id"], parent, agent["prompt"], followup)
+        self.count("git push")
+
+    def agent_status(self, agent):
+        """Derive the agent's status from the time elapsed since its last (re)start."""
+        if agent["stopped"]:
+            return "STOPPED"
+        elapsed = time.time() - agent["started_at"]
+        if elapsed < self.config.agent_duration * 0.1:
+            return "CREATING"
+        if elapsed < self.config.agent_duration:
+            return "RUNNING"
+        return "FAILED" if agent["fails"] else "FINISHED"
+
+    def schedule_webhooks(self, agent):
+        """Send callbacks when the agent starts running and when it ends (skipped if restarted or stopped meanwhile)."""
+        if not agent["webhook"]:
+            return
+        started_at = agent["started_at"]
+        for delay in (self.config.agent_duration * 0.1, self.config.agent_duration):
+            timer = threading.Timer(delay, self.send_webhook, (agent, started_at))
+            timer.daemon = True
+            timer.start()
+
+    def send_webhook(self, agent, started_at=None):
+        """POST a signed statusChange event to the agent's webhook URL."""
+        if started_at is not None and (agent["started_at"] != started_at or agent["stopped"]):
+            return
+        body = json.dumps({"event": "statusChange", "id": agent["id"], "status": self.agent_status(agent)}).encode("utf-8")
+        signature = "sha256=" + hmac.new(agent["webhook"]["secret"].encode("utf-8"), body, hashlib.sha256).hexdigest()
+        req = urllib.request.Request(agent["webhook"]["url"], data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "X-Webhook-Signature": signature})
+        self.count("webhook sent")
+        try:
+            urllib.request.urlopen(req, timeout=5).close()
+        except OSError:
+            self.count("webhook failed")
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def send_json(self, code, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def inject_failure(self):
+        """Apply latency and maybe answer with an injected error. Returns True if an error was sent."""
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+        if config.error_rate and config.random.random() < config.error_rate:
+            code = config.random.choice(config.error_codes)
+            self.server.count(f"error_{code}")
+            self.send_json(code, {"error": "injected"}, {"Retry-After": "0"} if code == 429 else None)
+            return True
+        return False
+
+    def do_GET(self):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["v0", "agents"]:
+            self.server.count("GET list")
+            if self.inject_failure():
+                return
+            agents = sorted(self.server.agents.values(), key=lambda a: a["created_at"], reverse=True)
+            return self.send_json(200, {"agents": [self.agent_payload(a) for a in agents]})
+
+        self.server.count("GET status")
+        if self.inject_failure():
+            return
+        if len(parts) == 3 and parts[:2] == ["v0", "agents"]:
+            agent = self.server.agents.get(parts[2])
+            if not agent:
+                return self.send_json(404, {"error": "not found"})
+            return self.send_json(200, self.agent_payload(agent))
+        self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        payload = self.read_json()
+
+        if parts == ["v1", "chat", "completions"]:
+            self.server.count("POST chat.completions")
+            if self.inject_failure():
+                return
+            return self.send_json(200, self.completion_payload(payload))
+
+        if parts == ["v0", "agents"]:
+            self.server.count("POST launch")
+            if self.inject_failure():
+                return
+            config = self.server.config
+            agent_id = f"bc-{uuid.uuid4().hex[:12]}"
+            agent = {
+                "id": agent_id,
+                "started_at": time.time(),
+                "created_at": time.time(),
+                "stopped": False,
+                "fails": config.agent_fail_rate > 0 and config.random.random() < config.agent_fail_rate,
+                "source": payload.get("source", {}),
+                "webhook": payload.get("webhook"),
+                "prompt": payload.get("prompt", {}).get("text", ""),
+            }
+            self.server.agents[agent_id] = agent
+            self.server.push_work(agent)
+            self.server.schedule_webhooks(agent)
+            return self.send_json(200, self.agent_payload(agent))
+
+        if len(parts) == 4 and parts[:2] == ["v0", "agents"] and parts[3] in ("followup", "stop"):
+            self.server.count(f"POST {parts[3]}")
+            if self.inject_failure():
+                return
+            agent = self.server.agents.get(parts[2])
+            if not agent:
+                return self.send_json(404, {"error": "not found"})
+            if parts[3] == "followup":
+                self.server.push_work(agent, followup=True)
+                agent["started_at"] = time.time()
+                self.server.schedule_webhooks(agent)
+            else:
+                agent["stopped"] = True
+                if agent["webhook"]:
+                    threading.Thread(target=self.server.send_webhook, args=(agent,), daemon=True).start()
+            return self.send_json(200, {"id": agent["id"]})
+
+        self.send_json(404, {"error": "not found"})
+
+    def agent_payload(self, agent):
+        return {
+            "id": agent["id"],
+            "status": self.server.agent_status(agent),
+            "source": agent["source"],
+            "target": {"branchName": f"cursor/{agent['id']}"},
+            "summary": f"Fake agent {agent['id']} implemented the requested changes.",
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(agent["created_at"])),
+        }
+
+    def completion_payload(self, request_payload):
+        config = self.server.config
+        failed = config.verify_fail_rate and config.random.random() < config.verify_fail_rate
+        verdict = {"status": "fail" if failed else "pass", "feedback": "Fake verifier verdict."}
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request_payload.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(verdict)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+def start_fake_server(config=None, host="127.0.0.1", port=0):
+    """Start the fake server on a background thread. Returns the server (see server.server_port)."""
+    server = FakeCursorServer((host, port), config or FakeConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Cursor Cloud Agents + OpenAI server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--agent-duration", type=float, default=3.0, help="Seconds until an agent finishes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/502/503")
+    parser.add_argument("--agent-fail-rate", type=float, default=0.0, help="Fraction of agents that end FAILED")
+    parser.add_argument("--verify-fail-rate", type=float, default=0.0, help="Fraction of verifications answered 'fail'")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible failure injection")
+    parser.add_argument("--origin", metavar="PATH", help="Bare git repository the fake agents push their branches to")
+    args = parser.parse_args()
+
+    config = FakeConfig(args.agent_duration, args.latency, args.error_rate,
+                        agent_fail_rate=args.agent_fail_rate, verify_fail_rate=args.verify_fail_rate, seed=args.seed, origin=args.origin)
+    server = FakeCursorServer(("127.0.0.1", args.port), config)
+    print(f"Fake server listening on http://127.0.0.1:{args.port} (Cursor: /v0/agents, OpenAI: /v1)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
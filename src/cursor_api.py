@@ -1,16 +1,24 @@
-import requests
-from src.utils import get_env_var, logger
+import os
+from src.utils import get_env_var, load_environment, logger
+from src.http_client import request
+from src.tracing import traced
 
 CURSOR_API_URL = "https://api.cursor.com/v0/agents"
 
+def api_url():
+    """Agents endpoint; CURSOR_API_URL points it at a local stand-in (see benchmarks/fake_server.py). Read per call so .env applies."""
+    load_environment()
+    return os.getenv("CURSOR_API_URL", CURSOR_API_URL)
+
 def get_headers():
     """Return headers for the Cursor API."""
     return {
         "Content-Type": "application/json"
     }
 
-def launch_agent(name, prompt_text, repository_url, source_ref="main", model=None):
-    """Launch a new Cursor Cloud Agent."""
+@traced("launch_agent")
+def launch_agent(name, prompt_text, repository_url, source_ref="main", model=None, webhook=None):
+    """Launch a new Cursor Cloud Agent. webhook ({"url", "secret"}) registers status-change callbacks."""
     payload = {
         "source": {
             "repository": repository_url,
@@ -23,29 +31,33 @@ def launch_agent(name, prompt_text, repository_url, source_ref="main", model=Non
     
     if model:
         payload["model"] = model
+    if webhook:
+        payload["webhook"] = webhook
     
     api_key = get_env_var("CURSOR_API_KEY")
-    response = requests.post(CURSOR_API_URL, headers=get_headers(), json=payload, auth=(api_key, ""))
+    response = request("POST", api_url(), idempotent=False, headers=get_headers(), json=payload, auth=(api_key, ""))
     if not (200 <= response.status_code < 300):
         logger.error(f"Failed to launch agent (HTTP {response.status_code}): {response.text}")
         response.raise_for_status()
     
     return response.json()
 
+@traced("get_agent_status")
 def get_agent_status(agent_id):
     """Retrieve the status of a Cursor Cloud Agent."""
-    url = f"{CURSOR_API_URL}/{agent_id}"
+    url = f"{api_url()}/{agent_id}"
     api_key = get_env_var("CURSOR_API_KEY")
-    response = requests.get(url, headers=get_headers(), auth=(api_key, ""))
+    response = request("GET", url, headers=get_headers(), auth=(api_key, ""))
     if not (200 <= response.status_code < 300):
         logger.error(f"Failed to get agent status (HTTP {response.status_code}): {response.text}")
         response.raise_for_status()
     
     return response.json()
 
+@traced("add_followup")
 def add_followup(agent_id, followup_text):
     """Add a follow-up instruction to a Cursor Cloud Agent."""
-    url = f"{CURSOR_API_URL}/{agent_id}/followup"
+    url = f"{api_url()}/{agent_id}/followup"
     payload = {
         "prompt": {
             "text": followup_text
@@ -53,9 +65,32 @@ def add_followup(agent_id, followup_text):
     }
     
     api_key = get_env_var("CURSOR_API_KEY")
-    response = requests.post(url, headers=get_headers(), json=payload, auth=(api_key, ""))
+    response = request("POST", url, idempotent=False, headers=get_headers(), json=payload, auth=(api_key, ""))
     if not (200 <= response.status_code < 300):
         logger.error(f"Failed to add followup (HTTP {response.status_code}): {response.text}")
         response.raise_for_status()
     
     return response.json()
+
+@traced("stop_agent")
+def stop_agent(agent_id):
+    """Stop a running Cursor Cloud Agent."""
+    url = f"{api_url()}/{agent_id}/stop"
+    api_key = get_env_var("CURSOR_API_KEY")
+    response = request("POST", url, headers=get_headers(), auth=(api_key, ""))
+    if not (200 <= response.status_code < 300):
+        logger.error(f"Failed to stop agent (HTTP {response.status_code}): {response.text}")
+        response.raise_for_status()
+    
+    return response.json()
+
+@traced("list_agents")
+def list_agents(limit=100):
+    """List the account's most recent Cloud Agents (newest first)."""
+    api_key = get_env_var("CURSOR_API_KEY")
+    response = request("GET", api_url(), headers=get_headers(), params={"limit": limit}, auth=(api_key, ""))
+    if not (200 <= response.status_code < 300):
+        logger.error(f"Failed to list agents (HTTP {response.status_code}): {response.text}")
+        response.raise_for_status()
+    
+    return response.json().get("agents", [])
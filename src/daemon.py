@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import urllib.request
+import urllib.error
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.utils import logger, DAEMON_HOST, DAEMON_PORT, DAEMON_MAX_AGENTS, DAEMON_CANCEL_GRACE, DAEMON_FORWARDED_ENV, POLISH_PHASES
+
+TERMINAL_JOB_STATUSES = ["completed", "failed", "cancelled"]
+
+_jobs = {}  # job_id -> job dict (JSON-serializable)
+_processes = {}  # job_id -> multiprocessing.Process
+_lock = threading.Condition()
+_next_id = 1
+_max_agents = DAEMON_MAX_AGENTS
+
+def daemon_url():
+    return f"http://{DAEMON_HOST}:{int(os.getenv('ORCHESTRATOR_DAEMON_PORT', DAEMON_PORT))}"
+
+def parse_concurrency(args):
+    """The flags of a job's arguments that start agents concurrently."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--feature")
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--fanout", type=int, default=0)
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--parallel-polish", action="store_true")
+
+    def reject(message):
+        raise ValueError(f"Invalid job arguments: {message}")
+    parser.error = reject
+    return parser.parse_known_args(args)[0]
+
+def job_slots(args):
+    """
+    Agents a job may run at once, counted against the global limit: the larger of its feature phase
+    (--parallel features, each with up to --fanout sub-agents, or a pipelined pair) and its polish
+    phase (all polish agents with --parallel-polish).
+    """
+    flags = parse_concurrency(args)
+    features = 1 if flags.feature else max(1, flags.parallel)
+    per_feature = max(1, flags.fanout)
+    if features == 1 and flags.pipeline and not flags.fanout:
+        features = 2  # a speculative agent runs while the previous one may be repairing
+    polish = 1 if flags.feature or not flags.parallel_polish else len(POLISH_PHASES)
+    return max(features * per_feature, polish)
+
+def run_job(workspace, args, env):
+    """Worker process entry: run the CLI in-process for one workspace, forked from the warm server."""
+    os.chdir(workspace)
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(workspace, ".env"), override=True)
+    os.environ.update(env)
+    # Turn SIGTERM (cancel) into SystemExit so the run's finally blocks record the outcome
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    # Imported here: the forkserver preloads it, and main itself imports this module
+    from src.main import main
+    sys.argv = ["main.py"] + args + ["--local"]
+    main()
+
+def _context():
+    """Fork workers from a preloaded server so each job skips interpreter and import startup."""
+    import multiprocessing
+    try:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["src.main", "src.workflow"])
+        return ctx
+    except ValueError:  # no fork on this platform
+        return multiprocessing.get_context("spawn")
+
+def submit(workspace, args, env=None):
+    """Queue a job for a workspace (a directory holding specs/ and state.json). Returns the job."""
+    global _next_id
+    workspace = os.path.abspath(workspace)
+    if not os.path.isdir(os.path.join(workspace, "specs")):
+        raise ValueError(f"No specs/ directory in {workspace}")
+    slots = job_slots(args)
+    flags = parse_concurrency(args)
+    if slots > _max_agents and flags.parallel > 1 and not flags.feature:
+        # Lower --parallel to fit (the last value wins in argparse)
+        args = list(args) + ["--parallel", str(max(1, _max_agents // max(1, flags.fanout)))]
+        slots = job_slots(args)
+    if slots > _max_agents:
+        raise ValueError(f"Job needs {slots} concurrent agents, more than the daemon's limit of {_max_agents} (lower --fanout or drop --parallel-polish)")
+    with _lock:
+        active = [j["id"] for j in _jobs.values() if j["workspace"] == workspace and j["status"] not in TERMINAL_JOB_STATUSES]
+        if active:
+            raise ValueError(f"Job {active[0]} is already active for {workspace}")
+        job = {
+            "id": str(_next_id),
+            "workspace": workspace,
+            "args": list(args),
+            "env": {k: v for k, v in (env or {}).items() if k in DAEMON_FORWARDED_ENV},
+            "slots": slots,
+            "status": "queued",
+            "attempt": 1,
+            "submitted_at": time.time(),
+        }
+        _next_id += 1
+        _jobs[job["id"]] = job
+        _lock.notify_all()
+    logger.info(f"Queued job {job['id']} for {job['workspace']}: {' '.join(args) or '(full run)'}")
+    return job
+
+def resume(job_id):
+    """Queue a finished, failed or cancelled job again; its workspace state makes it pick up where it stopped."""
+    with _lock:
+        job = _jobs[job_id]
+        if job["status"] not in TERMINAL_JOB_STATUSES:
+            raise ValueError(f"Job {job_id} is {job['status']}")
+        if any(j["workspace"] == job["workspace"] and j["status"] not in TERMINAL_JOB_STATUSES for j in _jobs.values()):
+            raise ValueError(f"Another job is already active for {job['workspace']}")
+        job.update(status="queued", attempt=job["attempt"] + 1, exit_code=None)
+        _lock.notify_all()
+    return job
+
+def cancel(job_id):
+    """Stop a job: dequeue it, or terminate its worker (agents keep running and are picked up on resume)."""
+    with _lock:
+        job = _jobs[job_id]
+        if job["status"] == "queued":
+            job["status"] = "cancelled"
+            return job
+        if job["status"] != "running":
+            raise ValueError(f"Job {job_id} is {job['status']}")
+        job["status"] = "cancelling"
+        process = _processes.get(job_id)
+
+    def stop():
+        process.terminate()
+        process.join(DAEMON_CANCEL_GRACE)
+        if process.is_alive():
+            logger.warning(f"Job {job_id} did not exit within {DAEMON_CANCEL_GRACE}s; killing it.")
+            process.kill()
+    threading.Thread(target=stop, daemon=True).start()
+    return job
+
+def list_agents():
+    """In-flight agents of running jobs, read from each workspace's state."""
+    from src.state_manager import read_state_snapshot
+    with _lock:
+        running = [dict(j) for j in _jobs.values() if j["status"] in ("running", "cancelling")]
+    agents = []
+    for job in running:
+        state = read_state_snapshot(job["workspace"])
+        for section in ("features", "polish"):
+            for name, entry in state.get(section, {}).items():
+                if entry.get("status") == "running" and entry.get("agent_id"):
+                    agents.append({"job": job["id"], "workspace": job["workspace"], "name": f"{section}/{name}", "agent_id": entry["agent_id"]})
+        for agent_id, curve in state.get("progress", {}).items():
+            if curve and curve[-1].get("status") in ("CREATING", "RUNNING") and not any(a["agent_id"] == agent_id for a in agents):
+                agents.append({"job": job["id"], "workspace": job["workspace"], "name": None, "agent_id": agent_id,
+                               "status": curve[-1]["status"], "since": curve[-1].get("at")})
+    return agents
+
+def _schedule(ctx):
+    """Start queued jobs while slots are free and reap finished workers. Runs on its own thread."""
+    while True:
+        with _lock:
+            for job_id, process in list(_processes.items()):
+                if not process.is_alive():
+                    job = _jobs[job_id]
+                    job["exit_code"] = process.exitcode
+                    job["finished_at"] = time.time()
+                    job["status"] = "cancelled" if job["status"] == "cancelling" else ("completed" if process.exitcode == 0 else "failed")
+                    del _processes[job_id]
+                    logger.info(f"Job {job_id} {job['status']} (exit code {process.exitcode}).")
+
+            used = sum(_jobs[j]["slots"] for j in _processes)
+            for job in sorted(_jobs.values(), key=lambda j: int(j["id"])):
+                if job["status"] != "queued":
+                    continue
+                if used + job["slots"] > _max_agents:
+                    break  # keep submission order
+                process = ctx.Process(target=run_job, args=(job["workspace"], job["args"], job["env"]), name=f"job-{job['id']}")
+                process.start()
+                _processes[job["id"]] = process
+                used += job["slots"]
+                job.update(status="running", pid=process.pid, started_at=time.time())
+                logger.info(f"Started job {job['id']} (pid {process.pid}, {job['slots']} slot(s), {used}/{_max_agents} in use).")
+            _lock.wait(timeout=1)
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """Local JSON API: GET /jobs, GET /agents, POST /jobs, POST /jobs/<id>/cancel|resume."""
+
+    def log_message(self, format, *args):
+        logger.debug(f"Daemon API: {format % args}")
+
+    def send_json(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/jobs":
+            with _lock:
+                return self.send_json(200, [dict(j, env=sorted(j["env"])) for j in _jobs.values()])
+        if self.path == "/agents":
+            return self.send_json(200, list_agents())
+        self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        try:
+            if parts == ["jobs"]:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                job = submit(payload["workspace"], payload.get("args", []), payload.get("env"))
+                return self.send_json(201, dict(job, env=sorted(job["env"])))
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("cancel", "resume"):
+                job = cancel(parts[1]) if parts[2] == "cancel" else resume(parts[1])
+                return self.send_json(200, dict(job, env=sorted(job["env"])))
+        except KeyError as e:
+            return self.send_json(404, {"error": f"unknown job or missing field: {e}"})
+        except ValueError as e:
+            return self.send_json(409, {"error": str(e)})
+        self.send_json(404, {"error": "not found"})
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def serve(max_agents=DAEMON_MAX_AGENTS):
+    """Run the daemon until interrupted."""
+    global _max_agents
+    _max_agents = max_agents
+    ctx = _context()
+    threading.Thread(target=_schedule, args=(ctx,), daemon=True).start()
+    url = daemon_url()
+    server = ThreadingHTTPServer((DAEMON_HOST, int(url.rsplit(":", 1)[1])), DaemonHandler)
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info(f"Daemon listening on {url} (max {max_agents} concurrent agents).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Daemon shutting down; running jobs are terminated and resume from their state next time.")
+    finally:
+        server.server_close()
+        with _lock:
+            for process in _processes.values():
+                process.terminate()
+
+def call(method, path, payload=None, timeout=10):
+    """Call the daemon API. Raises ConnectionError when no daemon is listening."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(daemon_url() + path, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read() or b"{}").get("error", f"HTTP {e.code}"))
+    except (urllib.error.URLError, OSError) as e:
+        raise ConnectionError(f"No daemon at {daemon_url()}: {e}")
+
+def is_running():
+    try:
+        call("GET", "/jobs", timeout=0.5)
+        return True
+    except ConnectionError:
+        return False
+
+def format_jobs(jobs):
+    lines = [f"{'JOB':<5} {'STATUS':<11} {'SLOTS':>5} {'TRY':>3}  WORKSPACE / ARGS"]
+    for job in jobs:
+        lines.append(f"{job['id']:<5} {job['status']:<11} {job['slots']:>5} {job['attempt']:>3}  {job['workspace']} {' '.join(job['args'])}".rstrip())
+    return "\n".join(lines)
+
+def format_agents(agents):
+    lines = [f"{'JOB':<5} {'AGENT':<28} NAME"]
+    for agent in agents:
+        lines.append(f"{agent['job']:<5} {agent['agent_id']:<28} {agent['name'] or agent.get('status', '')}")
+    return "\n".join(lines)
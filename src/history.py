@@ -0,0 +1,198 @@
+import math
+import time
+import sqlite3
+import threading
+from src.utils import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT,
+    args TEXT
+);
+CREATE TABLE IF NOT EXISTS features (
+    run_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    base_branch TEXT,
+    branch TEXT,
+    updated_at REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS polish_phases (
+    run_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    updated_at REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS agent_launches (
+    agent_id TEXT PRIMARY KEY,
+    run_id INTEGER,
+    kind TEXT,
+    name TEXT,
+    base_branch TEXT,
+    launched_at REAL,
+    finished_at REAL,
+    final_status TEXT,
+    polls INTEGER,
+    branch TEXT
+);
+CREATE TABLE IF NOT EXISTS verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER,
+    agent_id TEXT,
+    name TEXT,
+    round INTEGER,
+    status TEXT,
+    feedback TEXT,
+    started_at REAL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_features_name ON features (name);
+CREATE INDEX IF NOT EXISTS idx_launches_run ON agent_launches (run_id);
+CREATE INDEX IF NOT EXISTS idx_launches_name ON agent_launches (kind, name);
+CREATE INDEX IF NOT EXISTS idx_verifications_agent ON verifications (agent_id);
+"""
+
+_conn = None
+_run_id = None
+_lock = threading.Lock()
+
+def open_history(path):
+    """Open (and create if needed) the history database. Returns the connection."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.executescript(SCHEMA)
+    return conn
+
+def enable(path, args=""):
+    """Start recording this process's run into the SQLite database at path."""
+    global _conn, _run_id
+    with _lock:
+        _conn = open_history(path)
+        _run_id = _conn.execute("INSERT INTO runs (started_at, args) VALUES (?, ?)", (time.time(), args)).lastrowid
+        _conn.commit()
+    logger.info(f"Recording run history to {path} (run {_run_id}).")
+
+def is_enabled():
+    """Return True when this run is being recorded."""
+    return _conn is not None
+
+def _execute(sql, params, many=False):
+    """Run a write statement if recording is enabled. History must never break a run."""
+    if _conn is None:
+        return
+    try:
+        with _lock:
+            if many:
+                _conn.executemany(sql, params)
+            else:
+                _conn.execute(sql, params)
+            _conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to record history: {e}")
+
+def split_workflow_name(name):
+    """'Feature: 001-x' -> ('feature', '001-x')."""
+    kind, _, rest = name.partition(": ")
+    return (kind.lower(), rest) if rest else ("agent", name)
+
+def finish_run(status):
+    """Mark the current run as finished with the given status."""
+    _execute("UPDATE runs SET finished_at = ?, status = ? WHERE id = ?", (time.time(), status, _run_id))
+
+def record_state(state):
+    """Mirror the feature and polish entries of the state for the current run."""
+    if _conn is None:
+        return
+    now = time.time()
+    _execute(
+        "INSERT OR REPLACE INTO features (run_id, name, status, base_branch, branch, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [(_run_id, name, e.get("status"), e.get("base_branch"), e.get("branch"), now) for name, e in list(state.get("features", {}).items())],
+        many=True
+    )
+    _execute(
+        "INSERT OR REPLACE INTO polish_phases (run_id, name, status, updated_at) VALUES (?, ?, ?, ?)",
+        [(_run_id, name, e.get("status"), now) for name, e in list(state.get("polish", {}).items())],
+        many=True
+    )
+
+def record_launch(agent_id, name, base_branch):
+    """Record a freshly launched agent."""
+    kind, short_name = split_workflow_name(name)
+    _execute(
+        "INSERT OR REPLACE INTO agent_launches (agent_id, run_id, kind, name, base_branch, launched_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (agent_id, _run_id, kind, short_name, base_branch, time.time())
+    )
+
+def record_agent_end(agent_id, final_status, polls, branch=None):
+    """Record how a monitored agent ended. Resumed agents launched by an earlier run are kept with no launch time."""
+    _execute("INSERT OR IGNORE INTO agent_launches (agent_id, run_id) VALUES (?, ?)", (agent_id, _run_id))
+    _execute(
+        "UPDATE agent_launches SET finished_at = ?, final_status = ?, polls = COALESCE(polls, 0) + ?, branch = COALESCE(?, branch) WHERE agent_id = ?",
+        (time.time(), final_status, polls, branch, agent_id)
+    )
+
+def record_verification(agent_id, name, round_number, status, feedback, started_at):
+    """Record one verifier call (round 0 is the initial check, later rounds follow repairs)."""
+    _execute(
+        "INSERT INTO verifications (run_id, agent_id, name, round, status, feedback, started_at, duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (_run_id, agent_id, name, round_number, status, feedback, started_at, time.time() - started_at)
+    )
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def format_duration(seconds):
+    """Render seconds as e.g. '12m05s'."""
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}m{secs:02d}s"
+
+def history_report(path, limit=10):
+    """Build a text report of agent durations, failure rates and slowest phases across all runs."""
+    conn = open_history(path)
+    runs = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    rows = conn.execute(
+        "SELECT kind, name, final_status, finished_at - launched_at FROM agent_launches WHERE finished_at IS NOT NULL"
+    ).fetchall()
+    verdicts = conn.execute("SELECT status, COUNT(*) FROM verifications GROUP BY status").fetchall()
+    conn.close()
+
+    lines = [f"Runs recorded: {runs}", "", "Agent durations by kind:"]
+    kinds = sorted({r[0] or "agent" for r in rows})
+    for kind in kinds:
+        kind_rows = [r for r in rows if (r[0] or "agent") == kind]
+        durations = [r[3] for r in kind_rows if r[3] is not None]
+        failures = sum(1 for r in kind_rows if r[2] != "FINISHED")
+        lines.append(
+            f"  {kind:<10} agents={len(kind_rows):<4} p50={format_duration(percentile(durations, 0.5)):<8} "
+            f"p95={format_duration(percentile(durations, 0.95)):<8} failure_rate={failures / len(kind_rows):.0%}"
+        )
+    if not kinds:
+        lines.append("  (no finished agents recorded)")
+
+    total_verdicts = sum(c for _, c in verdicts)
+    if total_verdicts:
+        failed = sum(c for s, c in verdicts if s != "pass")
+        lines += ["", f"Verification attempts: {total_verdicts}, failure rate {failed / total_verdicts:.0%}"]
+
+    by_name = {}
+    for kind, name, _, duration in rows:
+        if duration is not None:
+            by_name.setdefault(f"{kind}: {name}", []).append(duration)
+    slowest = sorted(by_name.items(), key=lambda item: percentile(item[1], 0.5), reverse=True)[:limit]
+    lines += ["", f"Slowest features/phases (median, top {limit}):"]
+    for name, durations in slowest:
+        lines.append(f"  {format_duration(percentile(durations, 0.5)):<8} {name} ({len(durations)} agents)")
+    if not slowest:
+        lines.append("  (none)")
+    return "\n".join(lines)
@@ -0,0 +1,99 @@
+import time
+import random
+import threading
+from src import tracing
+from src.utils import logger, HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Codes that guarantee the server did not act on the request, so non-idempotent calls can be retried
+REJECTED_STATUS_CODES = {429, 503}
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every caller of the HTTP client."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_session = None
+_session_lock = threading.Lock()
+rate_limiter = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported on first use so commands that never hit the network start fast
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def retry_delay(attempt, response=None):
+    """Seconds to wait before the next attempt, honoring Retry-After when the server sends it."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass  # HTTP-date form: fall back to exponential backoff
+    delay = min(HTTP_BACKOFF_BASE * (2 ** attempt), HTTP_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+def request(method, url, idempotent=True, **kwargs):
+    """
+    Send a rate-limited request over the pooled session.
+    Retries connection errors, timeouts, 429 and 5xx responses with exponential backoff.
+    Non-idempotent calls (e.g. launching an agent) are only retried when the request
+    provably never reached the server, to avoid duplicates.
+    Returns the last response; callers decide how to handle non-2xx codes.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    session = get_session()
+    import requests  # already loaded by get_session()
+    retryable_codes = RETRYABLE_STATUS_CODES if idempotent else REJECTED_STATUS_CODES
+    retryable_errors = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectTimeout,)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        rate_limiter.acquire()
+        try:
+            response = session.request(method, url, **kwargs)
+        except retryable_errors as e:
+            tracing.count("cursor_http_errors_total", error=type(e).__name__)
+            if attempt == HTTP_MAX_RETRIES:
+                raise
+            tracing.count("cursor_http_retries_total", method=method)
+            delay = retry_delay(attempt)
+            logger.warning(f"{method} {url} failed ({e}); retrying in {delay:.1f}s ({attempt+1}/{HTTP_MAX_RETRIES})")
+            time.sleep(delay)
+            continue
+
+        tracing.count("cursor_http_responses_total", method=method, code=response.status_code)
+        if response.status_code not in retryable_codes or attempt == HTTP_MAX_RETRIES:
+            return response
+
+        tracing.count("cursor_http_retries_total", method=method)
+        delay = retry_delay(attempt, response)
+        logger.warning(f"{method} {url} returned HTTP {response.status_code}; retrying in {delay:.1f}s ({attempt+1}/{HTTP_MAX_RETRIES})")
+        time.sleep(delay)
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import inspect
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from src.utils import LOG_FORMAT, LOG_DATE_FORMAT, LOG_DIR, LOG_KEEP_RUNS, LOG_TABLE_ROWS
+
+# Structured fields attached to every record logged inside log_context()
+LOG_FIELDS = ("agent_id", "feature", "phase", "attempt")
+QUIET_LOGGERS = ("httpx", "httpcore", "openai")  # HTTP client libraries; only their warnings reach the run log
+DONE_STATUSES = ["FINISHED", "FAILED", "STOPPED", "DELETED", "EXPIRED", "CANCELLED", "STALLED", "TIMEOUT"]
+
+_fields = contextvars.ContextVar("log_fields", default={})
+_listener = None
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (agent_id, feature, phase, attempt) to records logged in this thread or task."""
+    token = _fields.set({**_fields.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _fields.reset(token)
+
+def log_fields(**arg_names):
+    """Decorator: run the function inside log_context with fields taken from its arguments, e.g. @log_fields(feature="feature_name")."""
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            with log_context(**{field: bound.arguments[arg] for field, arg in arg_names.items()}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class ContextFilter(logging.Filter):
+    """Copy the current log_context fields onto a record. Runs in the caller's thread, before the record is queued."""
+
+    def filter(self, record):
+        for key, value in _fields.get().items():
+            if getattr(record, key, None) is None:
+                setattr(record, key, value)
+        return True
+
+class ClientLogFilter(logging.Filter):
+    """Drop the HTTP clients' per-request INFO/DEBUG records, whatever level their loggers were set to."""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or record.name.split(".")[0] not in QUIET_LOGGERS
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, msg, plus the structured fields that are set."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "msg": record.getMessage()}
+        for field in LOG_FIELDS + ("status", "poll"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+def format_age(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m" if seconds >= 3600 else f"{seconds // 60}m{seconds % 60:02d}s"
+
+class StatusTable(logging.Handler):
+    """
+    Console handler for terminals: agent status records (those with a status field) update one row
+    per agent in a table redrawn in place; every other record is printed above the table.
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+        self.rows = {}
+        self.drawn = 0
+        self.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+
+    def emit(self, record):
+        try:
+            agent_id, status = getattr(record, "agent_id", None), getattr(record, "status", None)
+            if agent_id and status:
+                row = self.rows.setdefault(agent_id, {"since": record.created})
+                if row.get("status") != status:
+                    row["since"] = record.created
+                row.update(status=status, polls=getattr(record, "poll", None) or 0, updated=record.created,
+                           **{f: getattr(record, f, None) for f in ("feature", "phase", "attempt")})
+                self.redraw()
+            else:
+                self.redraw(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def render(self):
+        if not self.rows:
+            return ""
+        now = time.time()
+        rows = sorted(self.rows.items(), key=lambda item: (item[1]["status"] in DONE_STATUSES, -item[1]["updated"]))
+        lines = [f"{'AGENT':<26} {'FEATURE':<28} {'PHASE':<20} {'TRY':>3} {'STATUS':<9} {'POLLS':>5} {'FOR':>7}"]
+        for agent_id, row in rows[:LOG_TABLE_ROWS]:
+            lines.append(f"{agent_id[:26]:<26} {(row['feature'] or '-')[:28]:<28} {(row['phase'] or '-')[:20]:<20} "
+                         f"{row['attempt'] or 1:>3} {row['status'][:9]:<9} {row['polls']:>5} {format_age(now - row['since']):>7}")
+        if len(rows) > LOG_TABLE_ROWS:
+            lines.append(f"... {len(rows) - LOG_TABLE_ROWS} more agents")
+        return "\n".join(lines) + "\n"
+
+    def redraw(self, line=None):
+        """Erase the previous table, print line (if any) and draw the table again below it."""
+        table = self.render()
+        erase = f"\x1b[{self.drawn}F\x1b[J" if self.drawn else ""
+        self.stream.write(erase + (line + "\n" if line else "") + table)
+        self.stream.flush()
+        self.drawn = table.count("\n")
+
+def open_run_log(log_dir=LOG_DIR, keep=LOG_KEEP_RUNS):
+    """Create this run's log file, deleting the oldest run logs beyond keep. Returns its path."""
+    os.makedirs(log_dir, exist_ok=True)
+    runs = sorted(f for f in os.listdir(log_dir) if f.startswith("run-") and f.endswith(".jsonl"))
+    for old in runs[:max(0, len(runs) - keep + 1)]:
+        try:
+            os.remove(os.path.join(log_dir, old))
+        except OSError:
+            pass
+    return os.path.join(log_dir, f"run-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+
+def start(console=None):
+    """
+    Route all log records through a queue to a background writer thread, so logging never blocks
+    the caller on I/O. Records go as JSON lines to a new per-run file and to the console: a live
+    status table on a terminal ("table"), otherwise the usual text lines ("plain").
+    Returns the run log path.
+    """
+    global _listener
+    if console is None:
+        console = "table" if sys.stderr.isatty() else "plain"
+    path = open_run_log()
+    file_handler = logging.FileHandler(path)
+    file_handler.setFormatter(JsonFormatter())
+    if console == "table":
+        console_handler = StatusTable(sys.stderr)
+    else:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(ClientLogFilter())
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    for name in QUIET_LOGGERS:
+        # The OpenAI client logs every request at INFO (and OPENAI_LOG re-enables that when it is imported)
+        logging.getLogger(name).setLevel(logging.WARNING)
+    _listener = QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(stop)  # also flush when the run exits before reaching stop()
+    return path
+
+def stop():
+    """Flush queued records, close the run log and return to direct console logging."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT, force=True)
@@ -5,201 +5,116 @@ import os
 # Add project root to sys.path to support 'src.' imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.utils import logger, get_env_var
-from src.orchestrator import assemble_feature_prompt, assemble_polish_prompt, monitor_agent
-from src.cursor_api import launch_agent, add_followup
-from src.verifier import run_verification
-from src.state_manager import load_state, save_state
-
-def run_agent_workflow(name, prompt, repo_url, state, verifier_context=None, no_verify=False, model=None, existing_agent_id=None):
-    """Common workflow for launching an agent and optionally verifying its output."""
-    
-    if existing_agent_id:
-        logger.info(f"Resuming polling for existing agent '{name}' (ID: {existing_agent_id})...")
-        agent_id = existing_agent_id
-    else:
-        source_ref = state.get("last_successful_branch", "main")
-        logger.info(f"Launching agent '{name}' from base: {source_ref}...")
-        
-        result = launch_agent(name, prompt, repo_url, source_ref=source_ref, model=model)
-        agent_id = result.get("id")
-        logger.info(f"Agent launched successfully! ID: {agent_id}")
-    
-    # Monitor
-    status_data = monitor_agent(agent_id)
-    output_summary = status_data.get("summary", "Agent finished execution.")
-    
-    # Verification
-    if no_verify:
-        logger.info("Verification skipped (--no-verify or SKIP_VERIFICATION=true).")
-        v_status, v_feedback = "pass", "Verification skipped."
-    else:
-        logger.info("Starting verification via GPT-mini...")
-        # verifier_context should be the spec content for features or polish goal for polish
-        v_status, v_feedback = run_verification(name, verifier_context or "General verification", output_summary)
-    
-    if v_status == "pass":
-        logger.info(f"Workflow '{name}' PASSED.")
-        new_branch = status_data.get("target", {}).get("branchName")
-        if new_branch:
-            state["last_successful_branch"] = new_branch
-            logger.info(f"Updated last successful branch to: {new_branch}")
-        return True, v_feedback, agent_id
-    else:
-        logger.error(f"Workflow '{name}' FAILED: {v_feedback}")
-        return False, v_feedback, agent_id
-
-def process_feature(feature_name, feature_dir, repo_url, state, no_verify=False, model=None):
-    """Handle the implementation of a single feature."""
-    feature_state = state["features"].get(feature_name, {})
-    
-    if feature_state.get("status") == "completed":
-        logger.info(f"Feature {feature_name} already completed.")
-        return True
-
-    # Resume logic: if agent_id exists but not completed, try to resume polling
-    existing_id = feature_state.get("agent_id")
-    
-    prompt = assemble_feature_prompt(feature_dir)
-    with open(os.path.join(feature_dir, "spec.md"), 'r') as f: spec_content = f.read()
-
-    success, feedback, agent_id = run_agent_workflow(
-        f"Feature: {feature_name}", 
-        prompt, 
-        repo_url, 
-        state, 
-        verifier_context=spec_content, 
-        no_verify=no_verify,
-        model=model,
-        existing_agent_id=existing_id
-    )
-    
-    state["features"][feature_name] = {
-        "status": "completed" if success else "failed",
-        "agent_id": agent_id,
-        "last_feedback": feedback
-    }
-    save_state(state)
-    return success
-
-def process_polish(phase_name, repo_url, state, no_verify=False, model=None):
-    """Handle a single polish phase."""
-    polish_state = state["polish"].get(phase_name, {})
-    
-    if polish_state.get("status") == "completed":
-        logger.info(f"Polish phase {phase_name} already completed.")
-        return True
-
-    # Resume logic
-    existing_id = polish_state.get("agent_id")
-
-    prompt = assemble_polish_prompt(phase_name)
-    success, feedback, agent_id = run_agent_workflow(
-        f"Polish: {phase_name}", 
-        prompt, 
-        repo_url, 
-        state, 
-        verifier_context=f"Polish goal: {phase_name}", 
-        no_verify=no_verify,
-        model=model,
-        existing_agent_id=existing_id
-    )
-    
-    state["polish"][phase_name] = {
-        "status": "completed" if success else "failed",
-        "agent_id": agent_id,
-        "last_feedback": feedback
-    }
-    save_state(state)
-    return success
+from src.utils import logger, setup_logging, load_environment, MAX_REPAIR_ROUNDS, DAEMON_MAX_AGENTS, DAEMON_FORWARDED_ENV, STALL_WINDOW, HISTORY_DB, PROMPT_TOKEN_BUDGET, POLISH_PHASES
+
+# Only argparse and constants load at startup. Everything else, including the run path (asyncio,
+# HTTP and API clients) and .env, is loaded by the command that needs it, so --help, --dry-run and
+# the status commands return quickly.
 
 def main():
     parser = argparse.ArgumentParser(description="Cursor Cloud Agent Orchestrator")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "history", "specs", "daemon", "jobs", "agents", "cancel", "resume"],
+                        help="'run' the workflow (default), report run 'history', inspect 'specs', start the 'daemon', or manage its 'jobs', 'agents', 'cancel' and 'resume'")
+    parser.add_argument("target", nargs="?", help="For 'specs': 'list' (default) or 'stats'. For 'cancel'/'resume': the job ID")
     parser.add_argument("--feature", help="Feature directory name inside specs/ to implement (skips full loop)")
     parser.add_argument("--agent-id", help="Manually provide a Cursor Agent ID to resume polling/verification")
     parser.add_argument("--no-verify", action="store_true", help="Disable GPT-mini verification")
+    parser.add_argument("--no-verify-cache", action="store_true", help="Ignore cached verification verdicts and always call the verifier")
     parser.add_argument("--dry-run", action="store_true", help="Prepare prompt without launching agent")
+    parser.add_argument("--fanout", type=int, default=0, metavar="N", help="Split each feature by tasks.md phase and fan [P] tasks out to up to N parallel sub-agents")
+    parser.add_argument("--chunked", action="store_true", help="Run each feature as one agent per tasks.md phase, chained and checkpointed so failures resume from the failed phase")
+    parser.add_argument("--prompt-budget", type=int, default=PROMPT_TOKEN_BUDGET, metavar="TOKENS", help="Token budget for the spec context of a feature prompt (default: %(default)s)")
+    parser.add_argument("--repair-rounds", type=int, default=MAX_REPAIR_ROUNDS, metavar="N", help=f"Send verifier feedback back to the same agent up to N times before failing (default: {MAX_REPAIR_ROUNDS})")
+    parser.add_argument("--pipeline", action="store_true", help="Launch the next feature speculatively while the previous one is being verified (sequential mode, not with --fanout or --chunked)")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N", help="Run up to N independent features concurrently (dependencies from plan.md front-matter)")
+    parser.add_argument("--history-db", metavar="PATH", help=f"Record run history to this SQLite database (default: $ORCHESTRATOR_HISTORY_DB; for 'history': {HISTORY_DB})")
+    parser.add_argument("--parallel-polish", action="store_true", help="Run all polish phases at once from the same base and merge their branches locally")
+    parser.add_argument("--polish-merge-order", default=",".join(POLISH_PHASES), metavar="PHASES", help="Comma-separated merge order for --parallel-polish (default: %(default)s)")
+    parser.add_argument("--plan", action="store_true", help="Print which features would be rebuilt or reused, then exit")
+    parser.add_argument("--webhook-port", type=int, metavar="PORT", help="Receive agent status callbacks on PORT (0 = any free port) and poll only as a fallback")
+    parser.add_argument("--stall-window", type=int, default=STALL_WINDOW, metavar="SECONDS", help="Abort and relaunch an agent after this long without progress (off by default; use a window well above an agent's normal runtime)")
+    parser.add_argument("--no-reconcile", action="store_true", help="Skip the startup check of agents recorded in state; resume each one only when the run reaches it")
+    parser.add_argument("--local", action="store_true", help="Run in this process even if a daemon is running")
+    parser.add_argument("--max-agents", type=int, default=DAEMON_MAX_AGENTS, metavar="N", help="For 'daemon': global limit on concurrently running agents (default: %(default)s)")
+    parser.add_argument("--console", choices=["table", "plain"], help="Console output of a run: a live agent status table, or plain log lines (default: table on a terminal)")
+    parser.add_argument("--trace", metavar="PATH", help="Write a Chrome trace-event JSON of the run (open in Perfetto)")
+    parser.add_argument("--metrics", metavar="PATH", help="Write Prometheus textfile metrics (timings, HTTP codes, retries)")
     args = parser.parse_args()
-
-    REPO_URL = get_env_var("GITHUB_REPO_URL")
-    SKIP_VERIFICATION = args.no_verify or os.getenv("SKIP_VERIFICATION") == "true"
-    AGENT_MODEL = os.getenv("CURSOR_AGENT_MODEL") # Optional
-
-    try:
-        state = load_state()
-        specs_root = "specs"
-
-        # If agent-id is provided manually via CLI, inject it into the state for the target feature
-        if args.agent_id:
-            if not args.feature:
-                # Try to detect which feature to attach the ID to if not provided
-                features = sorted([d for d in os.listdir(specs_root) if os.path.isdir(os.path.join(specs_root, d))])
-                # Filter out completed ones if possible, or just pick the first one
-                target_feature = None
-                for f in features:
-                    if state["features"].get(f, {}).get("status") != "completed":
-                        target_feature = f
-                        break
-                
-                if not target_feature:
-                    logger.error("No active feature found to attach agent-id. Please use --feature <name> --agent-id <id>")
-                    sys.exit(1)
-                
-                logger.info(f"Attaching manual agent-id {args.agent_id} to feature: {target_feature}")
-                if target_feature not in state["features"]: state["features"][target_feature] = {}
-                state["features"][target_feature]["agent_id"] = args.agent_id
+    setup_logging()
+
+    if args.command == "specs":
+        if args.target not in (None, "list", "stats"):
+            parser.error("'specs' takes 'list' or 'stats'")
+        from src.spec_index import index_report
+        print(index_report("specs", args.target or "list"))
+        return
+
+    # Everything below may read settings from .env; --dry-run and --plan only read specs/ and state
+    if not args.dry_run and not args.plan:
+        load_environment()
+    args.history_db = args.history_db or os.getenv("ORCHESTRATOR_HISTORY_DB")
+
+    if args.command == "history":
+        from src import history
+        print(history.history_report(args.history_db or HISTORY_DB))
+        return
+
+    if args.command == "daemon":
+        from src import daemon
+        daemon.serve(args.max_agents)
+        return
+
+    if args.command in ("jobs", "agents", "cancel", "resume"):
+        if args.command in ("cancel", "resume") and not args.target:
+            parser.error(f"'{args.command}' needs a job ID")
+        from src import daemon
+        try:
+            if args.command == "jobs":
+                print(daemon.format_jobs(daemon.call("GET", "/jobs")))
+            elif args.command == "agents":
+                print(daemon.format_agents(daemon.call("GET", "/agents")))
             else:
-                logger.info(f"Attaching manual agent-id {args.agent_id} to feature: {args.feature}")
-                if args.feature not in state["features"]: state["features"][args.feature] = {}
-                state["features"][args.feature]["agent_id"] = args.agent_id
-            
-            save_state(state)
-
-        # Phase 1: Features
-        if state["current_phase"] == "features":
-            logger.info("--- PHASE 1: FEATURES ---")
-            features = sorted([d for d in os.listdir(specs_root) if os.path.isdir(os.path.join(specs_root, d))])
-            
-            for feature in features:
-                if args.feature and feature != args.feature:
-                    continue
-                    
-                feature_dir = os.path.join(specs_root, feature)
-                if args.dry_run:
-                    print(f"\n--- DRY RUN: FEATURE {feature} ---")
-                    print(assemble_feature_prompt(feature_dir))
-                    continue
-
-                if not process_feature(feature, feature_dir, REPO_URL, state, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL):
-                    logger.error(f"Feature {feature} implementation failed. Stopping.")
-                    sys.exit(1)
-            
-            if not args.feature and not args.dry_run:
-                state["current_phase"] = "polish"
-                save_state(state)
-                logger.info("All features completed. Moving to Phase 2: Polish.")
-
-        # Phase 2: Polish
-        if state["current_phase"] == "polish" and not args.feature:
-            logger.info("--- PHASE 2: POLISH ---")
-            polish_phases = ["logs", "errors", "hinting", "tests"]
-            
-            for phase in polish_phases:
-                if args.dry_run:
-                    print(f"\n--- DRY RUN: POLISH {phase} ---")
-                    print(assemble_polish_prompt(phase))
-                    continue
-
-                if not process_polish(phase, REPO_URL, state, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL):
-                    logger.error(f"Polish phase {phase} failed. Stopping.")
-                    sys.exit(1)
-            
-            if not args.dry_run:
-                logger.info("All polish phases completed successfully!")
-
-    except Exception as e:
-        logger.error(f"Fatal error: {e}")
-        sys.exit(1)
+                job = daemon.call("POST", f"/jobs/{args.target}/{args.command}")
+                print(f"Job {job['id']}: {job['status']}")
+        except (ConnectionError, RuntimeError) as e:
+            logger.error(str(e))
+            sys.exit(1)
+        return
+
+    # Read-only previews import only the spec index, state reader and prompt builders
+    if args.plan:
+        from src.preview import print_rebuild_plan
+        print_rebuild_plan("specs")
+        return
+
+    if args.chunked and args.fanout:
+        parser.error("--chunked and --fanout are mutually exclusive")
+
+    merge_order = [p.strip() for p in args.polish_merge_order.split(",") if p.strip()]
+    if sorted(merge_order) != sorted(POLISH_PHASES):
+        parser.error(f"--polish-merge-order must list each of: {', '.join(POLISH_PHASES)}")
+
+    if args.dry_run:
+        from src.preview import print_dry_run
+        print_dry_run(args)
+        return
+
+    # Thin client: hand the run to a running daemon, which keeps imports, pools and caches warm
+    if not args.local:
+        from src import daemon
+        if daemon.is_running():
+            forwarded = {k: os.environ[k] for k in DAEMON_FORWARDED_ENV if k in os.environ}
+            try:
+                job = daemon.call("POST", "/jobs", {"workspace": os.getcwd(), "args": sys.argv[1:], "env": forwarded})
+            except RuntimeError as e:
+                logger.error(f"Daemon rejected the job: {e}")
+                sys.exit(1)
+            print(f"Submitted job {job['id']} to the daemon at {daemon.daemon_url()}. Follow it with 'jobs' and 'agents'.")
+            return
+
+    # Heavy modules load only once a run actually starts
+    from src.workflow import run_workflow
+    run_workflow(args, merge_order)
 
 if __name__ == "__main__":
     main()
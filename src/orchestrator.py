@@ -1,122 +1,144 @@
-import os
-import re
-import time
-from src.utils import logger, get_env_var, POLLING_INTERVAL, MAX_POLLING_ATTEMPTS
-from src.cursor_api import get_agent_status
-
-IMPLEMENT_INSTRUCTIONS = """
-### IMPLEMENTATION RULES (from speckit.implement.md):
-1. **Analyze Context**: Read tasks.md, plan.md, and any other available spec files (data-model.md, research.md, etc.).
-2. **Setup Verification**: Ensure proper ignore files (.gitignore, etc.) are present and correct for the tech stack.
-3. **Phase-by-Phase**: Complete each phase (Setup, Core, Integration, Polish) defined in tasks.md.
-4. **Progress Tracking**: After each completed task, mark it as [X] in tasks.md and report progress.
-5. **Fail Fast**: If a non-parallel task fails, stop and report the error with context.
-6. **Final Validation**: Ensure all tasks match the original specification and the technical plan.
-"""
-
-POLISH_PROMPTS = {
-    "logs": """
-### POLISH PHASE: LOGS
-Goal: Ensure consistent, informative, and traceable logging.
-- Check all major functions for entry/exit logs.
-- Ensure log levels (INFO, ERROR, DEBUG) are used appropriately.
-- Add context to log messages where necessary.
-""",
-    "errors": """
-### POLISH PHASE: ERRORS
-Goal: Ensure robust error handling following the 'Fail Fast & Loud' policy.
-- Ensure all potential exceptions are caught and reported clearly.
-- Avoid silent failures (e.g., empty 'except' blocks).
-- Raise descriptive errors that help in debugging.
-""",
-    "hinting": """
-### POLISH PHASE: HINTING
-Goal: Ensure proper type hinting and inline documentation.
-- Add type hints to all function arguments and return types.
-- Ensure complex data structures are well-documented.
-- Follow PEP 8 and standard docstring conventions.
-""",
-    "tests": """
-### POLISH PHASE: TESTS
-Goal: Ensure existence and passing of unit, integration, and E2E tests.
-- Verify that all core functionalities have corresponding tests.
-- Run the tests to ensure they pass.
-- Add missing tests for edge cases identified during implementation.
-"""
-}
-
-def assemble_feature_prompt(feature_dir):
-    """Assemble a prompt for a full feature implementation."""
-    spec_path = os.path.join(feature_dir, "spec.md")
-    plan_path = os.path.join(feature_dir, "plan.md")
-    tasks_path = os.path.join(feature_dir, "tasks.md")
-
-    if not os.path.exists(spec_path) or not os.path.exists(plan_path) or not os.path.exists(tasks_path):
-        raise FileNotFoundError(f"Missing core spec files in {feature_dir}")
-
-    try:
-        with open(spec_path, 'r') as f: spec_content = f.read()
-        with open(plan_path, 'r') as f: plan_content = f.read()
-        with open(tasks_path, 'r') as f: tasks_content = f.read()
-    except Exception as e:
-        logger.error(f"Error reading feature files: {e}")
-        raise
-
-    prompt = f"""
-You are a Cursor Cloud Agent assigned to implement an entire feature.
-
-### CONTEXT:
-#### SPECIFICATION:
-{spec_content}
-
-#### IMPLEMENTATION PLAN:
-{plan_content}
-
-#### TASKS TO EXECUTE:
-{tasks_content}
-
-{IMPLEMENT_INSTRUCTIONS}
-
-Please implement the feature as described. Follow the plan and stay within the specification.
-Maintain progress in tasks.md as you work.
-Once finished, provide a summary of your changes.
-"""
-    return prompt.strip()
-
-def assemble_polish_prompt(phase_name):
-    """Assemble a prompt for a global polish phase."""
-    if phase_name not in POLISH_PROMPTS:
-        raise ValueError(f"Unknown polish phase: {phase_name}")
-
-    prompt = f"""
-You are a Cursor Cloud Agent assigned to a global polish phase of the project.
-
-{POLISH_PROMPTS[phase_name]}
-
-Please review the current state of the codebase and apply the necessary improvements as described.
-Once finished, provide a summary of your changes.
-"""
-    return prompt.strip()
-
-def monitor_agent(agent_id):
-    """Poll agent status until FINISHED or error."""
+import random
+import asyncio
+from src.utils import logger, get_env_var, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF_FACTOR, POLL_JITTER, MONITOR_TIMEOUT, FOLLOWUP_SETTLE_TIMEOUT, WEBHOOK_FALLBACK_INTERVAL, LOG_HEARTBEAT_INTERVAL
+from src.cursor_api import get_agent_status, stop_agent
+from src import history, webhook, watchdog
+from src.tracing import traced
+from src.log_pipeline import log_context
+
+TERMINAL_FAILURE_STATUSES = ["FAILED", "STOPPED", "DELETED", "EXPIRED", "CANCELLED"]
+
+def next_poll_interval(interval, status_changed):
+    """Reset to the minimum interval on a status change, otherwise back off exponentially."""
+    if status_changed:
+        return POLL_MIN_INTERVAL
+    return min(interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL)
+
+@traced("monitor_agent")
+async def watch_agent(agent_id, timeout=MONITOR_TIMEOUT, await_restart=False):
+    """
+    Poll a single agent with adaptive backoff until FINISHED, a terminal status, or the deadline.
+    When the webhook listener is running, status is re-read as soon as a callback arrives; with a
+    public callback URL polling only happens every WEBHOOK_FALLBACK_INTERVAL as a safety net.
+    With await_restart=True (after a follow-up) a stale FINISHED status is ignored until the agent
+    has been seen running again, or FOLLOWUP_SETTLE_TIMEOUT has elapsed.
+    An agent whose progress signals stay unchanged for the stall window is stopped and
+    watchdog.AgentStalledError is raised.
+    """
+    with log_context(agent_id=agent_id):
+        if webhook.enabled:
+            callback = webhook.subscribe(agent_id)
+            try:
+                return await _watch_agent(agent_id, timeout, await_restart, callback)
+            finally:
+                webhook.unsubscribe(agent_id, callback)
+        return await _watch_agent(agent_id, timeout, await_restart, None)
+
+async def _watch_agent(agent_id, timeout, await_restart, callback):
+    """watch_agent's loop; callback is the agent's webhook event or None to poll only."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    restarted = not await_restart
+    interval = POLL_MIN_INTERVAL
+    last_status = None
+    last_logged = started
     attempts = 0
-    while attempts < MAX_POLLING_ATTEMPTS:
-        logger.info(f"Polling status for agent {agent_id} (attempt {attempts+1})...")
-        status_data = get_agent_status(agent_id)
+    tracker = watchdog.ProgressTracker(agent_id) if watchdog.stall_window else None
+
+    while True:
+        attempts += 1
+        if callback:
+            callback.clear()  # callbacks arriving from here on trigger the next read
+        status_data = await asyncio.to_thread(get_agent_status, agent_id)
         status = status_data.get("status")
-        
-        logger.info(f"Agent status: {status}")
-        
+
+        # One line per status change plus a periodic heartbeat, however often the agent is polled
+        status_changed = status != last_status
+        if status_changed:
+            logger.info(f"Agent {agent_id} status: {status} (poll {attempts})", extra={"status": status, "poll": attempts})
+            last_logged = loop.time()
+        elif loop.time() - last_logged >= LOG_HEARTBEAT_INTERVAL:
+            logger.info(f"Agent {agent_id} still {status} after {loop.time() - started:.0f}s (poll {attempts})", extra={"status": status, "poll": attempts})
+            last_logged = loop.time()
+        else:
+            logger.debug(f"Agent {agent_id} still {status} (poll {attempts}, next in ~{interval:.0f}s)")
+        last_status = status
+
         if status == "FINISHED":
-            return status_data
-        elif status in ["FAILED", "STOPPED", "DELETED", "EXPIRED", "CANCELLED"]:
+            if restarted or loop.time() - started > FOLLOWUP_SETTLE_TIMEOUT:
+                history.record_agent_end(agent_id, status, attempts, status_data.get("target", {}).get("branchName"))
+                return status_data
+        elif status in TERMINAL_FAILURE_STATUSES:
+            history.record_agent_end(agent_id, status, attempts)
             raise RuntimeError(f"Agent {agent_id} ended with terminal status: {status}")
-        
-        time.sleep(POLLING_INTERVAL)
-        attempts += 1
-    
-    raise TimeoutError(f"Polling timeout for agent {agent_id}")
+        else:
+            restarted = True
+
+        if tracker and await tracker.stalled(status_data):
+            history.record_agent_end(agent_id, "STALLED", attempts)
+            logger.info(f"Agent {agent_id} status: STALLED (poll {attempts})", extra={"status": "STALLED", "poll": attempts})
+            try:
+                await asyncio.to_thread(stop_agent, agent_id)
+            except Exception as e:
+                logger.warning(f"Failed to stop stalled agent {agent_id}: {e}")
+            raise watchdog.AgentStalledError(agent_id, tracker.idle())
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            history.record_agent_end(agent_id, "TIMEOUT", attempts)
+            logger.info(f"Agent {agent_id} status: TIMEOUT (poll {attempts})", extra={"status": "TIMEOUT", "poll": attempts})
+            raise TimeoutError(f"Polling timeout for agent {agent_id}")
+
+        interval = next_poll_interval(interval, status_changed)
+        delay = interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        if callback:
+            if webhook.public:
+                # Still poll soon after a follow-up, whose restart may not produce a callback
+                delay = POLL_MIN_INTERVAL if not restarted else WEBHOOK_FALLBACK_INTERVAL
+            try:
+                await asyncio.wait_for(callback.wait(), min(delay, remaining))
+            except asyncio.TimeoutError:
+                logger.debug(f"No webhook callback for agent {agent_id} in {delay:.0f}s; polling.")
+            continue
+
+        await asyncio.sleep(min(delay, remaining))
+
+async def monitor_agents(agent_ids, timeout=MONITOR_TIMEOUT):
+    """
+    Watch many agents concurrently on one event loop.
+    Returns a dict mapping each agent_id to its final status data, or to the exception it ended with.
+    """
+    results = await asyncio.gather(*(watch_agent(a, timeout) for a in agent_ids), return_exceptions=True)
+    return dict(zip(agent_ids, results))
+
+async def watch_agent_alongside(agent_id, guard, timeout=MONITOR_TIMEOUT):
+    """
+    Watch agent_id while a background job (a concurrent.futures.Future returning a truthy value
+    when the agent is still wanted) completes.
+    Returns (status_data, guard_result); status_data is None if the guard invalidated the agent first.
+    """
+    watch = asyncio.create_task(watch_agent(agent_id, timeout))
+    wrapped = asyncio.wrap_future(guard)
+    done, _ = await asyncio.wait({watch, wrapped}, return_when=asyncio.FIRST_COMPLETED)
+
+    if wrapped in done and not wrapped.result():
+        watch.cancel()
+        return None, wrapped.result()
+
+    guard_result = await wrapped
+    if not guard_result:
+        watch.cancel()
+        return None, guard_result
+    return await watch, guard_result
+
+def monitor_agent_alongside(agent_id, guard, timeout=MONITOR_TIMEOUT):
+    """Blocking wrapper over watch_agent_alongside."""
+    return asyncio.run(watch_agent_alongside(agent_id, guard, timeout))
+
+def monitor_agent(agent_id, timeout=MONITOR_TIMEOUT, await_restart=False):
+    """Poll agent status until FINISHED or error (blocking wrapper over watch_agent)."""
+    return asyncio.run(watch_agent(agent_id, timeout, await_restart=await_restart))
 
 # Legacy functions kept for backward compatibility if needed temporarily
 def extract_task_details(task_id, tasks_md_path):
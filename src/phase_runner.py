@@ -0,0 +1,169 @@
+import os
+import asyncio
+from src.utils import logger, run_command, merge_branches, commit_paths, push_branch, worktree, GIT_LOCK
+from src.orchestrator import monitor_agents
+from src.prompts import assemble_task_group_prompt, assemble_phase_prompt
+from src.cursor_api import launch_agent
+from src import history, webhook
+from src.state_manager import sync_task_to_md, save_state, STATE_LOCK
+from src.spec_index import parse_tasks
+from src.log_pipeline import log_context
+
+def split_parallel_groups(tasks, max_width):
+    """Split [P] tasks into at most max_width contiguous groups of similar size."""
+    width = max(1, min(max_width, len(tasks)))
+    size, extra = divmod(len(tasks), width)
+    groups, start = [], 0
+    for i in range(width):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(tasks[start:end])
+        start = end
+    return [g for g in groups if g]
+
+def launch_and_monitor(jobs, repo_url, source_ref, model=None):
+    """
+    Launch one agent per (name, prompt) job from source_ref and wait for all of them.
+    Returns the list of final status data in job order. Raises if any agent does not finish.
+    """
+    agent_ids = []
+    for name, prompt in jobs:
+        result = launch_agent(name, prompt, repo_url, source_ref=source_ref, model=model, webhook=webhook.registration())
+        agent_ids.append(result.get("id"))
+        history.record_launch(result.get("id"), name, source_ref)
+        logger.info(f"Sub-agent '{name}' launched from {source_ref}. ID: {result.get('id')}")
+
+    results = asyncio.run(monitor_agents(agent_ids))
+    errors = [f"{a}: {r}" for a, r in results.items() if isinstance(r, Exception)]
+    if errors:
+        raise RuntimeError(f"Sub-agents failed: {'; '.join(errors)}")
+    return agent_ids, [results[a] for a in agent_ids]
+
+def run_phase_chunk(feature_name, feature_dir, phase_index, phase_count, phase, repo_url, source_ref, model=None):
+    """
+    Run every pending task of one tasks.md phase in a single agent chained from source_ref.
+    Returns (branch, agent_ids, summaries, branch_agent).
+    """
+    pending = [t for t in phase["tasks"] if not t["done"]]
+    if not pending:
+        return source_ref, [], [], None
+
+    job = (f"Feature: {feature_name} / {phase['name']}", assemble_phase_prompt(feature_dir, phase["name"], pending, phase_index, phase_count))
+    ids, statuses = launch_and_monitor([job], repo_url, source_ref, model=model)
+    branch = statuses[0].get("target", {}).get("branchName") or source_ref
+    return branch, ids, [statuses[0].get("summary", "")], ids[0]
+
+def run_phase(feature_name, feature_dir, phase_index, phase, repo_url, source_ref, max_width, model=None):
+    """
+    Run one tasks.md phase: fan out its [P] tasks to parallel sub-agents, merge their branches
+    locally and mark the tasks done in tasks.md, then run the remaining sequential tasks
+    in a single agent on top of the merge.
+    Returns (branch, agent_ids, summaries, branch_agent); branch_agent is the agent that pushed branch,
+    None when the phase ends with a local merge.
+    """
+    pending = [t for t in phase["tasks"] if not t["done"]]
+    parallel = [t for t in pending if t["parallel"]]
+    serial = [t for t in pending if not t["parallel"]]
+    branch, agent_ids, summaries, branch_agent = source_ref, [], [], None
+
+    if parallel:
+        groups = split_parallel_groups(parallel, max_width)
+        jobs = [
+            (f"Feature: {feature_name} / {phase['name']} / group {i+1}", assemble_task_group_prompt(feature_dir, phase["name"], g, track_progress=False))
+            for i, g in enumerate(groups)
+        ]
+        logger.info(f"Fanning out {len(parallel)} parallel tasks of '{phase['name']}' to {len(jobs)} sub-agents.")
+        ids, statuses = launch_and_monitor(jobs, repo_url, branch, model=model)
+        agent_ids += ids
+        summaries += [s.get("summary", "") for s in statuses]
+
+        branches = [s.get("target", {}).get("branchName") for s in statuses]
+        if any(not b for b in branches):
+            raise RuntimeError(f"A sub-agent of '{phase['name']}' reported no target branch")
+
+        merged = f"orchestrator/{feature_name}/phase-{phase_index}"
+        logger.info(f"Merging {len(branches)} sub-agent branches into {merged}...")
+        with GIT_LOCK, worktree() as path:
+            merge_branches(branch, branches, merged, cwd=path)
+            # Only tasks.md is committed, from the worktree's copy of it
+            tasks_md_path = os.path.relpath(os.path.abspath(os.path.join(feature_dir, "tasks.md")), run_command("git rev-parse --show-toplevel"))
+            for task in parallel:
+                sync_task_to_md(task["id"], os.path.join(path, tasks_md_path), completed=True)
+            commit_paths(f"Mark {phase['name'].split(':')[0]} parallel tasks of {feature_name} as done", [tasks_md_path], cwd=path)
+            push_branch(merged, cwd=path)
+        branch, branch_agent = merged, None
+
+    if serial:
+        job = (f"Feature: {feature_name} / {phase['name']}", assemble_task_group_prompt(feature_dir, phase["name"], serial))
+        ids, statuses = launch_and_monitor([job], repo_url, branch, model=model)
+        agent_ids += ids
+        summaries.append(statuses[0].get("summary", ""))
+        branch = statuses[0].get("target", {}).get("branchName") or branch
+        branch_agent = ids[0]
+
+    return branch, agent_ids, summaries, branch_agent
+
+def run_feature_fanout(feature_name, feature_dir, repo_url, state, max_width, model=None, source_ref=None, chunked=False):
+    """
+    Implement a feature phase by phase, fanning [P] task groups out to parallel sub-agents.
+    With chunked, each phase instead runs in a single agent with a compact spec summary.
+    Completed phases are checkpointed in state (branch, agents, summaries) so a resume skips them and
+    restarts at the failed phase. Verification is left to the caller, which gets the feature as one
+    agent's status data: "id" is the agent that pushed the final branch (None after a local merge).
+    Returns (success, error, agent_ids, status_data).
+    """
+    phases = parse_tasks(os.path.join(feature_dir, "tasks.md"))
+    if not phases:
+        raise ValueError(f"No phases found in tasks.md for {feature_name}")
+
+    with STATE_LOCK:
+        feature_state = state["features"].setdefault(feature_name, {})
+        checkpoints = feature_state.setdefault("phases", {})
+
+    branch = base_branch = source_ref or state.get("last_successful_branch", "main")
+    agent_ids, summaries, branch_agent = [], [], None
+
+    def status_data():
+        return {"id": branch_agent, "summary": "\n\n".join(s for s in summaries if s), "target": {"branchName": branch}, "source": {"ref": base_branch}}
+
+    for index, phase in enumerate(phases, start=1):
+        checkpoint = checkpoints.get(phase["name"], {})
+        if checkpoint.get("status") == "completed":
+            logger.info(f"Phase '{phase['name']}' of {feature_name} already completed.")
+            branch = checkpoint.get("branch") or branch
+            agent_ids += checkpoint.get("agent_ids", [])
+            summaries += checkpoint.get("summaries", [])
+            branch_agent = checkpoint.get("branch_agent", branch_agent)
+            continue
+
+        try:
+            with log_context(phase=phase["name"]):
+                if chunked:
+                    phase_branch, ids, phase_summaries, phase_agent = run_phase_chunk(feature_name, feature_dir, index, len(phases), phase, repo_url, branch, model=model)
+                else:
+                    phase_branch, ids, phase_summaries, phase_agent = run_phase(feature_name, feature_dir, index, phase, repo_url, branch, max_width, model=model)
+        except Exception as e:
+            logger.error(f"Phase '{phase['name']}' of {feature_name} failed: {e}")
+            with STATE_LOCK:
+                checkpoints[phase["name"]] = {"status": "failed", "error": str(e)}
+                save_state(state)
+            return False, str(e), agent_ids, status_data()
+
+        if phase_branch != branch:
+            branch, branch_agent = phase_branch, phase_agent
+        agent_ids += ids
+        summaries += phase_summaries
+        with STATE_LOCK:
+            checkpoints[phase["name"]] = {"status": "completed", "branch": branch, "agent_ids": ids, "summaries": phase_summaries, "branch_agent": branch_agent}
+            save_state(state)
+
+    logger.info(f"All {len(phases)} phases of {feature_name} done ({'chunked' if chunked else 'fan-out'}).")
+    return True, None, agent_ids, status_data()
+
+def reopen_last_phase(state, feature_name, feature_dir, feedback):
+    """Mark the feature's last phase for rework after a failed verification, so a retry relaunches it instead of re-verifying the same branch."""
+    phases = parse_tasks(os.path.join(feature_dir, "tasks.md"))
+    with STATE_LOCK:
+        checkpoints = state["features"].get(feature_name, {}).get("phases", {})
+        if phases and checkpoints.get(phases[-1]["name"], {}).get("status") == "completed":
+            checkpoints[phases[-1]["name"]] = {"status": "rework", "error": feedback}
+            save_state(state)
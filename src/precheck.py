@@ -0,0 +1,86 @@
+import os
+import subprocess
+from src.utils import logger, fetch_branches, rev_parse, list_files, show_file, diff_numstat, diff_text, PRECHECK_MIN_DONE_RATIO, PRECHECK_EXCERPT_CHARS, PRECHECK_EXCERPT_FILE_CHARS
+from src.spec_index import parse_tasks_text, load_feature
+
+def path_present(path, files):
+    """A referenced path is present if a file has that path or ends with it (tasks often omit leading directories)."""
+    return any(f == path or f.endswith("/" + path) for f in files)
+
+def check_branch(branch, base_branch, feature_dir=None):
+    """
+    Deterministic checks of an agent's branch against the branch it started from: the [X] tasks in
+    the feature's tasks.md, the task-referenced paths present in its tree, and its diff stats.
+    Returns None when the branches cannot be read (e.g. not running inside a clone of the target repository).
+    """
+    base_ref, ref = f"origin/{base_branch}", f"origin/{branch}"
+    tasks_path = f"{os.path.normpath(feature_dir).replace(os.sep, '/')}/tasks.md" if feature_dir else None
+    try:
+        fetch_branches([base_branch, branch])
+        head = rev_parse(ref)
+        changes = diff_numstat(base_ref, ref)
+        files = list_files(ref)
+        tasks_text = show_file(ref, tasks_path) if tasks_path else None
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.info(f"Pre-verification of {branch} unavailable ({(getattr(e, 'stderr', None) or str(e)).strip()}); using the LLM verifier alone.")
+        return None
+
+    checks = {"branch": branch, "base": base_branch, "base_ref": base_ref, "ref": ref, "head": head, "tasks": None, "paths": None}
+    tasks = [t for phase in parse_tasks_text(tasks_text or "") for t in phase["tasks"]]
+    if tasks:
+        checks["tasks"] = {"total": len(tasks), "done": sum(1 for t in tasks if t["done"]), "pending": [t["id"] for t in tasks if not t["done"]]}
+    if feature_dir:
+        expected = load_feature(feature_dir)["paths"]
+        checks["paths"] = {"expected": len(expected), "missing": [p for p in expected if not path_present(p, files)]}
+
+    # Checkbox updates in specs/ are not implementation work
+    checks["changed"] = [c for c in changes if not c[0].startswith("specs/")]
+    checks["diff"] = {
+        "files": len(checks["changed"]),
+        "insertions": sum(c[1] for c in checks["changed"]),
+        "deletions": sum(c[2] for c in checks["changed"]),
+    }
+    return checks
+
+def decide(checks):
+    """Return a (status, feedback) verdict for clear-cut checks, or None when the LLM should judge."""
+    tasks, paths, diff = checks["tasks"], checks["paths"], checks["diff"]
+    if not diff["files"]:
+        return "fail", f"Branch {checks['branch']} has no changes outside specs/ relative to {checks['base']}."
+    if tasks and tasks["done"] / tasks["total"] < PRECHECK_MIN_DONE_RATIO:
+        return "fail", f"Only {tasks['done']}/{tasks['total']} tasks are marked [X] in tasks.md. Pending: {', '.join(tasks['pending'])}."
+    if tasks and not tasks["pending"] and paths is not None and not paths["missing"]:
+        return "pass", (f"All {tasks['total']} tasks are marked [X], all {paths['expected']} referenced paths exist, "
+                        f"and {diff['files']} files changed (+{diff['insertions']}/-{diff['deletions']}).")
+    return None
+
+def format_checks(checks):
+    """Render check results for the verifier prompt."""
+    tasks, paths, diff = checks["tasks"], checks["paths"], checks["diff"]
+    lines = [f"Branch {checks['branch']} compared with {checks['base']}:"]
+    if tasks:
+        lines.append(f"- Tasks marked [X]: {tasks['done']}/{tasks['total']}" + (f" (pending: {', '.join(tasks['pending'])})" if tasks["pending"] else ""))
+    if paths and paths["expected"]:
+        present = paths["expected"] - len(paths["missing"])
+        lines.append(f"- Referenced paths present: {present}/{paths['expected']}" + (f" (missing: {', '.join(paths['missing'])})" if paths["missing"] else ""))
+    lines.append(f"- Diff: {diff['files']} files changed outside specs/, +{diff['insertions']}/-{diff['deletions']}")
+    return "\n".join(lines)
+
+def diff_excerpt(checks):
+    """Diffs of the most-changed files, each cut to PRECHECK_EXCERPT_FILE_CHARS, within PRECHECK_EXCERPT_CHARS in total."""
+    changed = sorted(checks["changed"], key=lambda c: c[1] + c[2], reverse=True)
+    shown = changed[:max(1, PRECHECK_EXCERPT_CHARS // PRECHECK_EXCERPT_FILE_CHARS)]
+    try:
+        text = diff_text(checks["base_ref"], checks["ref"], [c[0] for c in shown])
+    except subprocess.CalledProcessError:
+        return ""
+    if not text:
+        return ""
+
+    excerpts = []
+    for chunk in text.split("\ndiff --git ")[:len(shown)]:
+        chunk = chunk if chunk.startswith("diff --git ") else "diff --git " + chunk
+        excerpts.append(chunk if len(chunk) <= PRECHECK_EXCERPT_FILE_CHARS else chunk[:PRECHECK_EXCERPT_FILE_CHARS] + "\n... (truncated)")
+    if len(changed) > len(shown):
+        excerpts.append(f"... ({len(changed) - len(shown)} more changed files not shown)")
+    return "\n".join(excerpts)
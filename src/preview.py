@@ -0,0 +1,60 @@
+import os
+from src.utils import POLISH_PHASES
+from src.prompts import assemble_feature_prompt, assemble_phase_prompt, assemble_polish_prompt
+from src.prompt_budget import build_context, format_budget_report, set_token_budget
+from src.state_manager import read_state_snapshot, default_state
+from src import spec_index
+from src.spec_index import parse_tasks
+from src.scheduler import list_features, build_dependency_graph, topological_order, plan_rebuild
+
+# Read-only previews of a run (--dry-run, --plan). They read specs/ and the persisted state
+# without taking the state lock or writing the spec index, and never load the run modules
+# (asyncio, the API client, .env).
+
+def read_state():
+    """The persisted state with load_state's defaults filled in; also stops spec index writes."""
+    spec_index.disable_persistence()
+    return dict(default_state(), **read_state_snapshot())
+
+def print_dry_run(args, specs_root="specs"):
+    """Print the prompts the next run would send, for parsed CLI args."""
+    set_token_budget(args.prompt_budget)
+    state = read_state()
+
+    if state["current_phase"] == "features":
+        deps = build_dependency_graph(specs_root, list_features(specs_root))
+        for feature in topological_order(deps):
+            if args.feature and feature != args.feature:
+                continue
+
+            feature_dir = os.path.join(specs_root, feature)
+            if args.chunked:
+                phases = parse_tasks(os.path.join(feature_dir, "tasks.md"))
+                for index, phase in enumerate(phases, start=1):
+                    pending = [t for t in phase["tasks"] if not t["done"]]
+                    if pending:
+                        print(f"\n--- DRY RUN: FEATURE {feature} / {phase['name']} ---")
+                        print(assemble_phase_prompt(feature_dir, phase["name"], pending, index, len(phases)))
+            else:
+                print(f"\n--- DRY RUN: FEATURE {feature} ---")
+                print(assemble_feature_prompt(feature_dir))
+                print(f"\n--- PROMPT BUDGET: FEATURE {feature} ---")
+                print(format_budget_report(build_context(feature_dir)[1]))
+
+    if state["current_phase"] == "polish" and not args.feature:
+        for phase in POLISH_PHASES:
+            print(f"\n--- DRY RUN: POLISH {phase} ---")
+            print(assemble_polish_prompt(phase))
+
+def print_rebuild_plan(specs_root="specs"):
+    """Print which features the next run would launch and why."""
+    state = read_state()
+    deps = build_dependency_graph(specs_root, list_features(specs_root))
+    plan = plan_rebuild(deps, state, specs_root)
+    for feature, reason in plan.items():
+        print(f"{'rebuild' if reason else 'reuse':<8} {feature}" + (f" ({reason})" if reason else ""))
+
+    rebuilt = [f for f, reason in plan.items() if reason]
+    if any(state["features"].get(f, {}).get("status") == "completed" for f in rebuilt):
+        print("polish   all phases (features changed)")
+    print(f"\n{len(rebuilt)} to build, {len(plan) - len(rebuilt)} reused.")
@@ -0,0 +1,183 @@
+import os
+import re
+import hashlib
+import threading
+from src.utils import logger, PROMPT_TOKEN_BUDGET
+from src.spec_index import read_feature_file
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a word/punctuation estimate
+    _encoding = None
+
+# Files that make up a feature's context, in prompt order
+CONTEXT_FILES = [
+    ("spec.md", "SPECIFICATION"),
+    ("plan.md", "IMPLEMENTATION PLAN"),
+    ("tasks.md", "TASKS TO EXECUTE"),
+]
+REQUIRED_FILES = ["spec.md", "plan.md", "tasks.md"]
+# Supporting documents are not inlined; the prompt only points the agent at the ones that exist
+SUPPORTING_FILES = ["data-model.md", "research.md", "quickstart.md"]
+
+PRIORITY_HEADINGS = re.compile(r"acceptance|requirement|success criteria|user stor|user scenario", re.IGNORECASE)
+PLAN_CORE_HEADINGS = re.compile(r"summary|technical context", re.IGNORECASE)
+
+token_budget = PROMPT_TOKEN_BUDGET
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def set_token_budget(tokens):
+    """Override the context token budget for this process (--prompt-budget)."""
+    global token_budget
+    token_budget = tokens
+
+def count_tokens(text):
+    """Count tokens offline (tiktoken when installed, otherwise words and punctuation marks)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def split_sections(content):
+    """Split markdown into (heading, text) sections at '## ' headings. Text before the first one gets heading ''."""
+    sections, heading, lines = [], "", []
+    for line in content.splitlines():
+        if line.startswith("## "):
+            if any(l.strip() for l in lines):
+                sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = line[3:].strip(), []
+        lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+def section_rank(filename, heading):
+    """Lower ranks are kept first when the budget is tight: tasks, then acceptance criteria and requirements."""
+    if filename == "tasks.md":
+        return 0
+    if filename == "spec.md" and PRIORITY_HEADINGS.search(heading):
+        return 1
+    if filename == "plan.md" and PLAN_CORE_HEADINGS.search(heading):
+        return 2
+    if filename == "spec.md":
+        return 3
+    if filename == "plan.md":
+        return 4
+    return 5
+
+def normalize_paragraph(paragraph):
+    return re.sub(r"\s+", " ", paragraph).strip().lower()
+
+def split_paragraphs(text):
+    """Split on blank lines, keeping a leading heading line as its own paragraph."""
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", text):
+        first, _, rest = block.strip("\n").partition("\n")
+        if first.lstrip().startswith("#") and rest.strip():
+            paragraphs += [first, rest]
+        else:
+            paragraphs.append(block)
+    return paragraphs
+
+def dedupe_paragraphs(text, seen):
+    """Drop paragraphs already in seen (whitespace/case-insensitive). Headings are never dropped. Returns (text, dropped)."""
+    kept, dropped = [], 0
+    for paragraph in split_paragraphs(text):
+        key = normalize_paragraph(paragraph)
+        if not key:
+            continue
+        if key in seen and not paragraph.lstrip().startswith("#"):
+            dropped += 1
+            continue
+        seen.add(key)
+        kept.append(paragraph.strip("\n"))
+    return "\n\n".join(kept), dropped
+
+def read_context_files(feature_dir):
+    """Read the feature's context files. Returns [(filename, title, content)]."""
+    for filename in REQUIRED_FILES:
+        if not os.path.exists(os.path.join(feature_dir, filename)):
+            raise FileNotFoundError(f"Missing core spec files in {feature_dir}")
+
+    files = []
+    for filename, title in CONTEXT_FILES:
+        if os.path.exists(os.path.join(feature_dir, filename)):
+            files.append((filename, title, read_feature_file(feature_dir, filename)))
+    return files
+
+def build_context(feature_dir, budget=None):
+    """
+    Assemble a feature's spec context within a token budget.
+    Sections are deduplicated and admitted in rank order until the budget is spent (tasks are
+    always kept, even beyond it), then rendered back in file order. Results are memoized by file content hash.
+    Returns (context, report) where report lists {file, section, tokens, status} per section.
+    """
+    budget = budget or token_budget
+    files = read_context_files(feature_dir)
+    supporting = [f for f in SUPPORTING_FILES if os.path.exists(os.path.join(feature_dir, f))]
+
+    digest = hashlib.sha256(f"{budget}\0{feature_dir}\0{','.join(supporting)}".encode("utf-8"))
+    for filename, _, content in files:
+        digest.update(f"\0{filename}\0{content}".encode("utf-8"))
+    key = digest.hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+
+    sections = []
+    for file_index, (filename, title, content) in enumerate(files):
+        for section_index, (heading, text) in enumerate(split_sections(content)):
+            sections.append({
+                "order": (file_index, section_index),
+                "rank": section_rank(filename, heading),
+                "file": filename,
+                "title": title,
+                "section": heading or "(preamble)",
+                "text": text,
+            })
+
+    seen, used = set(), 0
+    for s in sorted(sections, key=lambda s: (s["rank"], s["order"])):
+        # Dedupe against a copy so paragraphs of omitted sections don't suppress later copies
+        section_seen = set(seen)
+        s["text"], dropped = dedupe_paragraphs(s["text"], section_seen)
+        s["tokens"] = count_tokens(s["text"])
+        if s["rank"] > 0 and used + s["tokens"] > budget:
+            s["status"] = "omitted"
+            continue
+        seen = section_seen
+        used += s["tokens"]
+        s["status"] = f"kept ({dropped} duplicate paragraphs removed)" if dropped else "kept"
+
+    blocks, omitted = [], []
+    for filename, title, _ in files:
+        kept = [s["text"] for s in sections if s["file"] == filename and s["status"] != "omitted"]
+        if kept:
+            blocks.append(f"#### {title}:\n" + "\n\n".join(kept))
+        omitted += [f"{filename} / {s['section']}" for s in sections if s["file"] == filename and s["status"] == "omitted"]
+    if omitted:
+        blocks.append("#### OMITTED FOR LENGTH (read these sections from the repository if needed):\n" + "\n".join(f"- {o}" for o in omitted))
+        logger.info(f"Prompt budget of {budget} tokens reached for {feature_dir}; omitted {len(omitted)} sections.")
+    if supporting:
+        blocks.append("#### SUPPORTING DOCUMENTS (in the repository, read them when needed):\n" + "\n".join(f"- {os.path.join(feature_dir, f).replace(os.sep, '/')}" for f in supporting))
+    if used > budget:
+        logger.warning(f"Context for {feature_dir} is {used} tokens, over the budget of {budget}, because tasks.md is always kept in full.")
+
+    report = [{k: s[k] for k in ("file", "section", "tokens", "status")} for s in sorted(sections, key=lambda s: s["order"])]
+    result = ("\n\n".join(blocks), report)
+    with _cache_lock:
+        _cache[key] = result
+    return result
+
+def format_budget_report(report, budget=None):
+    """Render a per-section token table for --dry-run."""
+    budget = budget or token_budget
+    lines = [f"{'TOKENS':>7}  {'FILE':<14} {'SECTION':<36} STATUS"]
+    for row in report:
+        lines.append(f"{row['tokens']:>7}  {row['file']:<14} {row['section'][:36]:<36} {row['status']}")
+    kept = sum(r["tokens"] for r in report if r["status"] != "omitted")
+    over = f", {kept - budget} over: tasks are always kept" if kept > budget else ""
+    lines.append(f"{kept:>7}  total kept (budget {budget}{over}{', tiktoken' if _encoding is not None else ', estimated'})")
+    return "\n".join(lines)
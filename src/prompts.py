@@ -0,0 +1,243 @@
+import os
+import re
+import hashlib
+from src.utils import logger
+from src.tracing import traced
+from src.prompt_budget import build_context
+from src.spec_index import read_feature_file
+
+# Bump whenever prompt templates change so completed features are rebuilt with the new prompts
+PROMPT_TEMPLATE_VERSION = 2
+FEATURE_INPUT_FILES = ["spec.md", "plan.md", "tasks.md", "data-model.md", "research.md", "quickstart.md"]
+
+IMPLEMENT_INSTRUCTIONS = """
+### IMPLEMENTATION RULES (from speckit.implement.md):
+1. **Analyze Context**: Read tasks.md, plan.md, and any other available spec files (data-model.md, research.md, etc.).
+2. **Setup Verification**: Ensure proper ignore files (.gitignore, etc.) are present and correct for the tech stack.
+3. **Phase-by-Phase**: Complete each phase (Setup, Core, Integration, Polish) defined in tasks.md.
+4. **Progress Tracking**: After each completed task, mark it as [X] in tasks.md and report progress.
+5. **Fail Fast**: If a non-parallel task fails, stop and report the error with context.
+6. **Final Validation**: Ensure all tasks match the original specification and the technical plan.
+"""
+
+POLISH_PROMPTS = {
+    "logs": """
+### POLISH PHASE: LOGS
+Goal: Ensure consistent, informative, and traceable logging.
+- Check all major functions for entry/exit logs.
+- Ensure log levels (INFO, ERROR, DEBUG) are used appropriately.
+- Add context to log messages where necessary.
+""",
+    "errors": """
+### POLISH PHASE: ERRORS
+Goal: Ensure robust error handling following the 'Fail Fast & Loud' policy.
+- Ensure all potential exceptions are caught and reported clearly.
+- Avoid silent failures (e.g., empty 'except' blocks).
+- Raise descriptive errors that help in debugging.
+""",
+    "hinting": """
+### POLISH PHASE: HINTING
+Goal: Ensure proper type hinting and inline documentation.
+- Add type hints to all function arguments and return types.
+- Ensure complex data structures are well-documented.
+- Follow PEP 8 and standard docstring conventions.
+""",
+    "tests": """
+### POLISH PHASE: TESTS
+Goal: Ensure existence and passing of unit, integration, and E2E tests.
+- Verify that all core functionalities have corresponding tests.
+- Run the tests to ensure they pass.
+- Add missing tests for edge cases identified during implementation.
+"""
+}
+
+def feature_input_hash(feature_dir):
+    """
+    Content hash of the files that define a feature plus the prompt template version.
+    Task checkboxes are normalized so progress marks in tasks.md don't count as edits.
+    """
+    digest = hashlib.sha256(f"prompt-template-v{PROMPT_TEMPLATE_VERSION}".encode("utf-8"))
+    for filename in FEATURE_INPUT_FILES:
+        content = ""
+        if os.path.exists(os.path.join(feature_dir, filename)):
+            content = read_feature_file(feature_dir, filename)
+        if filename == "tasks.md":
+            content = re.sub(r"^- \[[xX ]\]", "- [ ]", content, flags=re.MULTILINE)
+        digest.update(f"\0{filename}\0{content}".encode("utf-8"))
+    return digest.hexdigest()
+
+@traced("assemble_feature_prompt")
+def assemble_feature_prompt(feature_dir):
+    """Assemble a prompt for a full feature implementation (spec context trimmed to the token budget)."""
+    try:
+        context, _ = build_context(feature_dir)
+    except Exception as e:
+        logger.error(f"Error reading feature files: {e}")
+        raise
+
+    prompt = f"""
+You are a Cursor Cloud Agent assigned to implement an entire feature.
+
+### CONTEXT:
+{context}
+
+{IMPLEMENT_INSTRUCTIONS}
+
+Please implement the feature as described. Follow the plan and stay within the specification.
+Maintain progress in tasks.md as you work.
+Once finished, provide a summary of your changes.
+"""
+    return prompt.strip()
+
+def format_task_line(task):
+    """Render a parsed task back into its tasks.md line."""
+    marker = "[X]" if task["done"] else "[ ]"
+    tags = (" [P]" if task["parallel"] else "") + (f" [{task['story']}]" if task["story"] else "")
+    return f"- {marker} {task['id']}{tags} {task['description']}"
+
+SPEC_SUMMARY_PLAN_SECTIONS = ["Summary", "Technical Context"]
+
+def compact_spec_summary(feature_dir):
+    """
+    Condense spec.md to its headings and requirement/criteria bullets, and plan.md to its
+    Summary and Technical Context sections. Used by chunked agents that only need the gist.
+    """
+    spec_content = read_feature_file(feature_dir, "spec.md")
+    plan_content = read_feature_file(feature_dir, "plan.md")
+
+    spec_lines = [
+        line for line in spec_content.splitlines()
+        if line.startswith("#") or re.match(r"^\s*- \*\*[A-Z]+-\d+\*\*", line)
+    ]
+
+    plan_lines, keep = [], False
+    for line in plan_content.splitlines():
+        if line.startswith("## "):
+            keep = line[3:].strip() in SPEC_SUMMARY_PLAN_SECTIONS
+        if keep and line.strip():
+            plan_lines.append(line)
+
+    return "\n".join(spec_lines + [""] + plan_lines).strip()
+
+@traced("assemble_phase_prompt")
+def assemble_phase_prompt(feature_dir, phase_name, tasks, phase_number, phase_count):
+    """Assemble the prompt for one chunk of a chunked feature: a single tasks.md phase plus a compact spec summary."""
+    if not tasks:
+        raise ValueError(f"No pending tasks in {phase_name}")
+
+    task_lines = "\n".join(format_task_line(t) for t in tasks)
+    prompt = f"""
+You are a Cursor Cloud Agent assigned to one phase ({phase_number} of {phase_count}) of a larger feature.
+Earlier phases are already implemented on your starting branch; later phases will be handled by other agents.
+
+### CONTEXT:
+#### SPECIFICATION SUMMARY:
+{compact_spec_summary(feature_dir)}
+
+The full spec.md, plan.md and tasks.md are in the feature directory of the repository; read them if you need more detail.
+
+#### YOUR TASKS ({phase_name}):
+{task_lines}
+
+{IMPLEMENT_INSTRUCTIONS}
+
+Implement ONLY the tasks of this phase, building on the existing code.
+Mark your tasks as [X] in tasks.md as you complete them.
+Once finished, provide a summary of your changes.
+"""
+    return prompt.strip()
+
+@traced("assemble_task_group_prompt")
+def assemble_task_group_prompt(feature_dir, phase_name, tasks, track_progress=True):
+    """
+    Assemble a narrowed prompt for a sub-agent that implements only a subset of a feature's tasks.
+    With track_progress=False the agent must leave tasks.md untouched (the orchestrator marks the tasks
+    after merging, which avoids conflicts between parallel branches).
+    """
+    spec_path = os.path.join(feature_dir, "spec.md")
+    plan_path = os.path.join(feature_dir, "plan.md")
+
+    if not os.path.exists(spec_path) or not os.path.exists(plan_path):
+        raise FileNotFoundError(f"Missing core spec files in {feature_dir}")
+
+    try:
+        spec_content = read_feature_file(feature_dir, "spec.md")
+        plan_content = read_feature_file(feature_dir, "plan.md")
+    except Exception as e:
+        logger.error(f"Error reading feature files: {e}")
+        raise
+
+    task_lines = "\n".join(format_task_line(t) for t in tasks)
+    task_ids = ", ".join(t["id"] for t in tasks)
+    if track_progress:
+        progress_rule = "Mark only your tasks as [X] in tasks.md as you complete them."
+    else:
+        progress_rule = "Do NOT edit tasks.md; the orchestrator records progress for parallel tasks."
+
+    prompt = f"""
+You are a Cursor Cloud Agent assigned to a subset of tasks of a larger feature.
+Other agents are implementing the remaining tasks in parallel on separate branches.
+
+### CONTEXT:
+#### SPECIFICATION:
+{spec_content}
+
+#### IMPLEMENTATION PLAN:
+{plan_content}
+
+#### YOUR TASKS ({phase_name}):
+{task_lines}
+
+{IMPLEMENT_INSTRUCTIONS}
+
+Implement ONLY tasks {task_ids}. Do not modify files that belong to other tasks.
+{progress_rule}
+Once finished, provide a summary of your changes.
+"""
+    return prompt.strip()
+
+def assemble_repair_prompt(feedback, round_number):
+    """Assemble a follow-up prompt that asks the agent to fix what the verifier flagged."""
+    prompt = f"""
+### VERIFICATION FEEDBACK (repair round {round_number})
+An automated review of your work against the specification found it incomplete:
+
+{feedback}
+
+Please address every missing or incorrect point above on the same branch.
+Do not redo work that was already accepted.
+Once finished, provide an updated summary of ALL your changes.
+"""
+    return prompt.strip()
+
+def assemble_reconcile_prompt(branches):
+    """Assemble a prompt for an agent that merges branches the orchestrator could not merge cleanly."""
+    branch_lines = "\n".join(f"- {b}" for b in branches)
+    prompt = f"""
+You are a Cursor Cloud Agent assigned to reconcile parallel polish work.
+
+Several polish agents worked on the codebase in parallel. Their branches have been merged
+into your starting branch, except the following ones which conflicted:
+{branch_lines}
+
+Merge each of these branches into your branch, resolving every conflict so that the
+intent of both sides is preserved. Make sure the project still builds and its tests pass.
+Once finished, provide a summary of the conflicts and how you resolved them.
+"""
+    return prompt.strip()
+
+@traced("assemble_polish_prompt")
+def assemble_polish_prompt(phase_name):
+    """Assemble a prompt for a global polish phase."""
+    if phase_name not in POLISH_PROMPTS:
+        raise ValueError(f"Unknown polish phase: {phase_name}")
+
+    prompt = f"""
+You are a Cursor Cloud Agent assigned to a global polish phase of the project.
+
+{POLISH_PROMPTS[phase_name]}
+
+Please review the current state of the codebase and apply the necessary improvements as described.
+Once finished, provide a summary of your changes.
+"""
+    return prompt.strip()
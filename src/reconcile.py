@@ -0,0 +1,195 @@
+import time
+import asyncio
+from datetime import datetime
+from src.utils import logger, RECONCILE_ADOPT_WINDOW, RECONCILE_CLOCK_SKEW
+from src.cursor_api import get_agent_status, list_agents
+from src.orchestrator import TERMINAL_FAILURE_STATUSES
+from src.state_manager import save_state, STATE_LOCK
+from src import history
+
+# state["launches"] maps a workflow name ("Feature: 001-x") to its latest launch:
+# {"source_ref", "repository", "at"} written before the launch call, plus "agent_id" once it returns.
+# Entries are dropped when the step's outcome is recorded, so the ones left are interrupted launches.
+
+def record_launch_intent(state, name, repo_url, source_ref):
+    """Persist that an agent is about to be launched for name, before the launch call."""
+    with STATE_LOCK:
+        state.setdefault("launches", {})[name] = {"source_ref": source_ref, "repository": repo_url, "at": time.time()}
+        save_state(state)
+
+def record_launched(state, name, agent_id):
+    """Persist the agent ID a launch returned."""
+    with STATE_LOCK:
+        state.setdefault("launches", {}).setdefault(name, {})["agent_id"] = agent_id
+        save_state(state)
+
+def clear_launch(state, name):
+    """Drop the launch entry of a step whose outcome is recorded (caller holds STATE_LOCK and saves)."""
+    state.get("launches", {}).pop(name, None)
+
+def entry_key(state, name):
+    """Map a workflow name to its state entry: 'Feature: 001-x' -> ('features', '001-x'). None for other agents."""
+    kind, _, key = name.partition(": ")
+    section = {"Feature": "features", "Polish": "polish"}.get(kind)
+    if not section or not key or (section == "polish" and key not in state["polish"]):
+        return None
+    return section, key
+
+def claimed_agents(state):
+    """Every agent ID the state already accounts for."""
+    ids = set()
+    for section in ("features", "polish"):
+        for entry in state.get(section, {}).values():
+            ids.update([entry.get("agent_id"), entry.get("previous_agent_id")] + entry.get("agent_ids", []) + entry.get("invalidated_agents", []))
+    ids.update(launch.get("agent_id") for launch in state.get("launches", {}).values())
+    ids.discard(None)
+    return ids
+
+def repository_name(url):
+    """'https://github.com/owner/repo.git' -> 'owner/repo', so URL spellings compare equal."""
+    name = "/".join((url or "").rstrip("/").split("/")[-2:]).lower()
+    return name[:-4] if name.endswith(".git") else name
+
+def created_at(agent):
+    try:
+        return datetime.fromisoformat(agent["createdAt"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+def find_orphans(intent, agents, claimed):
+    """Unclaimed agents created from the intent's repository and base branch around the time of the launch."""
+    matches = []
+    for agent in agents:
+        source, created = agent.get("source", {}), created_at(agent)
+        if (agent.get("id") not in claimed and created is not None
+                and source.get("ref") == intent["source_ref"]
+                and repository_name(source.get("repository")) == repository_name(intent["repository"])
+                and intent["at"] - RECONCILE_CLOCK_SKEW <= created <= intent["at"] + RECONCILE_ADOPT_WINDOW):
+            matches.append(agent)
+    return matches
+
+def adopt_launches(state):
+    """
+    Fold the launch entries left by an interrupted run into their feature or polish entries.
+    Launches that recorded their agent ID are adopted directly. For the others (the run died inside
+    the launch call) the account's agent list is searched, and the agent is adopted when exactly one
+    unclaimed agent matches. Returns [(name, agent_id, how)] with how "recorded" or "matched".
+    """
+    launches = state.get("launches", {})
+    if not launches:
+        return []
+
+    adopted, agents = [], None
+    claimed = claimed_agents(state)
+    with STATE_LOCK:
+        for name, intent in list(launches.items()):
+            target = entry_key(state, name)
+            agent_id, how = intent.get("agent_id"), "recorded"
+            if target and not agent_id and intent.get("source_ref"):
+                if agents is None:
+                    try:
+                        agents = list_agents()
+                    except Exception as e:
+                        logger.warning(f"Cannot list agents to find orphaned launches: {e}")
+                        agents = []
+                matches = find_orphans(intent, agents, claimed)
+                if len(matches) == 1:
+                    agent_id, how = matches[0]["id"], "matched"
+                elif matches:
+                    logger.warning(f"{len(matches)} unrecorded agents could belong to '{name}' ({', '.join(a['id'] for a in matches)}); adopting none.")
+                else:
+                    logger.info(f"No agent was created by the interrupted launch of '{name}'.")
+
+            if target and agent_id:
+                section, key = target
+                entry = state[section].get(key, {})
+                if entry.get("status") != "completed" and entry.get("agent_id") != agent_id:
+                    state[section][key] = dict(entry, status="running", agent_id=agent_id, base_branch=intent["source_ref"])
+                    claimed.add(agent_id)
+                    adopted.append((name, agent_id, how))
+            del launches[name]
+        save_state(state)
+    return adopted
+
+def pending_agents(state, feature=None):
+    """(section, key, agent_id) of every unfinished entry with a single agent to resume; only feature's with feature."""
+    sections = [("features", {feature: state["features"].get(feature, {})})] if feature else [(s, state[s]) for s in ("features", "polish")]
+    return [
+        (section, key, entry["agent_id"])
+        for section, entries in sections for key, entry in entries.items()
+        if entry.get("agent_id") and entry.get("status") not in ("completed", "failed")
+    ]
+
+async def poll_agents(agent_ids):
+    """Read the status of every agent at once. Returns {agent_id: status data or the exception raised}."""
+    results = await asyncio.gather(*(asyncio.to_thread(get_agent_status, a) for a in agent_ids), return_exceptions=True)
+    return dict(zip(agent_ids, results))
+
+def plan_resume(state, feature=None):
+    """
+    Poll every agent recorded in state concurrently and decide what to do with each:
+    'verify' (FINISHED), 'relaunch' (ended without finishing, or no longer exists) or 'resume'
+    (still running, or unreachable right now). Returns a list of dicts with section, key,
+    agent_id, status, action and status_data.
+    """
+    agents = pending_agents(state, feature)
+    if not agents:
+        return []
+    results = asyncio.run(poll_agents([a[2] for a in agents]))
+
+    plan = []
+    for section, key, agent_id in agents:
+        result, status_data = results[agent_id], None
+        if isinstance(result, Exception):
+            if getattr(getattr(result, "response", None), "status_code", None) == 404:
+                status, action = "DELETED", "relaunch"
+            else:
+                status, action = "UNKNOWN", "resume"
+                logger.warning(f"Could not read agent {agent_id} ({section}/{key}): {result}")
+        else:
+            status_data, status = result, result.get("status")
+            action = "verify" if status == "FINISHED" else "relaunch" if status in TERMINAL_FAILURE_STATUSES else "resume"
+        if action != "resume":
+            history.record_agent_end(agent_id, status, 1, (status_data or {}).get("target", {}).get("branchName"))
+        plan.append({"section": section, "key": key, "agent_id": agent_id, "status": status, "action": action, "status_data": status_data})
+    return plan
+
+def release_agent(state, item):
+    """Reset an entry whose agent ended without finishing so the run launches a fresh one (caller holds STATE_LOCK and saves)."""
+    entry = state[item["section"]][item["key"]]
+    state[item["section"]][item["key"]] = {
+        "status": "pending",
+        "reason": f"agent {item['agent_id']} ended {item['status']}",
+        "previous_agent_id": item["agent_id"],
+        "repair_rounds": entry.get("repair_rounds", [])
+    }
+
+def speculation_status(state, entry):
+    """
+    Whether a feature launched speculatively by --pipeline can be accepted: "valid" once the feature it
+    built on completed on that same branch without repair rounds after the launch, "invalid" when that
+    feature failed, was reset or repaired, None while it is still running.
+    """
+    base = state["features"].get(entry.get("speculative_on"), {})
+    if base.get("status") == "running":
+        return None
+    if (base.get("status") == "completed" and base.get("branch") == entry.get("base_branch")
+            and len(base.get("repair_rounds", [])) == entry.get("base_repairs", 0)):
+        return "valid"
+    return "invalid"
+
+def reset_speculative(state, key, reason):
+    """Send a speculative feature whose base was not accepted back to pending (caller holds STATE_LOCK and saves)."""
+    entry = state["features"][key]
+    state["features"][key] = {
+        "status": "pending",
+        "reason": reason,
+        "invalidated_agents": entry.get("invalidated_agents", []) + [entry["agent_id"]],
+        "repair_rounds": entry.get("repair_rounds", [])
+    }
+
+def format_resume_plan(plan):
+    lines = [f"Resume plan for {len(plan)} recorded agent(s):"]
+    for item in plan:
+        lines.append(f"  {item['action']:<8} {item['section']}/{item['key']} (agent {item['agent_id']}: {item['status']})")
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.utils import logger, merge_branches, push_branch, worktree, GIT_LOCK
+from src.prompts import feature_input_hash
+from src.spec_index import load_index, load_feature
+
+def list_features(specs_root):
+    """Return the sorted feature directory names inside specs_root."""
+    return list(load_index(specs_root))
+
+def build_dependency_graph(specs_root, features):
+    """Map each feature to the features it depends on (from plan.md front-matter)."""
+    deps = {f: list(load_feature(os.path.join(specs_root, f))["depends_on"]) for f in features}
+    for feature, feature_deps in deps.items():
+        for dep in feature_deps:
+            if dep not in deps:
+                raise ValueError(f"Feature {feature} depends on unknown feature: {dep}")
+    return deps
+
+def topological_order(deps):
+    """Return features ordered so every dependency precedes its dependents (ties broken by name)."""
+    remaining = {f: set(d) for f, d in deps.items()}
+    order = []
+    while remaining:
+        ready = sorted(f for f, d in remaining.items() if not d)
+        if not ready:
+            raise ValueError(f"Dependency cycle detected between features: {', '.join(sorted(remaining))}")
+        for f in ready:
+            order.append(f)
+            del remaining[f]
+        for d in remaining.values():
+            d.difference_update(ready)
+    return order
+
+def plan_rebuild(deps, state, specs_root):
+    """
+    Decide which features must run, build-system style.
+    Returns {feature: reason} where reason is None for completed features whose inputs are unchanged,
+    otherwise 'pending', 'changed' or 'dependent of <feature>'.
+    Completed features recorded before input hashing existed are treated as unchanged.
+    """
+    plan = {}
+    for feature in topological_order(deps):
+        entry = state["features"].get(feature, {})
+        if entry.get("status") != "completed":
+            plan[feature] = "pending"
+        elif entry.get("input_hash") and entry["input_hash"] != feature_input_hash(os.path.join(specs_root, feature)):
+            plan[feature] = "changed"
+        else:
+            stale_dep = next((d for d in deps[feature] if plan[d] not in (None, "pending")), None)
+            plan[feature] = f"dependent of {stale_dep}" if stale_dep else None
+    return plan
+
+def invalidate_features(state, plan):
+    """Reset completed features that the rebuild plan marks stale so they relaunch. Returns their names."""
+    stale = [f for f, reason in plan.items() if reason and state["features"].get(f, {}).get("status") == "completed"]
+    for feature in stale:
+        previous = state["features"][feature]
+        state["features"][feature] = {
+            "status": "stale",
+            "reason": plan[feature],
+            "previous_agent_id": previous.get("agent_id"),
+            "previous_branch": previous.get("branch")
+        }
+    if stale:
+        # Polish phases build on every feature, so they are rebuilt too
+        state["current_phase"] = "features"
+        for phase in state["polish"]:
+            state["polish"][phase] = {"status": "pending"}
+    return stale
+
+def resolve_base_branch(feature, deps, state, root_branch):
+    """
+    Pick the branch a feature should start from based on its dependencies. With several dependency
+    branches they are merged into orchestrator/<feature>/base, which is pushed and returned.
+    Raises if the dependency branches do not merge cleanly.
+    """
+    branches = []
+    for dep in deps.get(feature, []):
+        branch = state["features"].get(dep, {}).get("branch")
+        if branch and branch not in branches:
+            branches.append(branch)
+    if not branches:
+        return root_branch
+    if len(branches) == 1:
+        return branches[0]
+
+    target = f"orchestrator/{feature}/base"
+    logger.info(f"Merging the branches of {', '.join(deps[feature])} into {target}...")
+    with GIT_LOCK, worktree() as path:
+        merge_branches(branches[0], branches[1:], target, cwd=path)
+        push_branch(target, cwd=path)
+    return target
+
+def run_features_parallel(deps, run_feature, state, max_parallel):
+    """
+    Launch every feature whose dependencies are completed, up to max_parallel at once.
+    run_feature(feature, source_ref) must return True on success.
+    Stops scheduling new features after the first failure. Returns True if all features completed.
+    """
+    order = topological_order(deps)
+    root_branch = state.get("last_successful_branch", "main")
+
+    # Pre-create entries so worker threads only replace values, never resize the dict
+    for f in order:
+        state["features"].setdefault(f, {})
+
+    done = {f for f in order if state["features"][f].get("status") == "completed"}
+    running = {}
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while True:
+            if not failed:
+                for f in order:
+                    if len(running) >= max_parallel:
+                        break
+                    if f in done or f in running.values():
+                        continue
+                    if all(d in done for d in deps[f]):
+                        try:
+                            source_ref = resolve_base_branch(f, deps, state, root_branch)
+                        except Exception as e:
+                            logger.error(f"Cannot build the base branch of feature {f} from its dependencies: {e}")
+                            failed.append(f)
+                            break
+                        logger.info(f"Scheduling feature {f} from base: {source_ref}")
+                        running[pool.submit(run_feature, f, source_ref)] = f
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                f = running.pop(future)
+                try:
+                    success = future.result()
+                except Exception as e:
+                    logger.error(f"Feature {f} raised an error: {e}")
+                    success = False
+
+                if success:
+                    done.add(f)
+                else:
+                    logger.error(f"Feature {f} failed. No new features will be scheduled.")
+                    failed.append(f)
+
+    return not failed and len(done) == len(order)
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import time
+import threading
+from src.utils import logger, SPEC_INDEX_FILE
+
+INDEX_VERSION = 2
+INDEXED_FILES = ["spec.md", "plan.md", "tasks.md"]
+
+PHASE_HEADER_PATTERN = re.compile(r"^## (Phase \d+.*)$")
+TASK_LINE_PATTERN = re.compile(r"^- \[([ xX])\] (T\d+)( \[P\])?(?: \[(US\d+)\])? (.*)$")
+STORY_PRIORITY_PATTERN = re.compile(r"^#+ User Story (\d+)\b.*\(Priority: (P\d+)\)", re.MULTILINE)
+# Referenced paths: anything with a directory, or a backticked file name (bare "word.ext" is too often prose, e.g. "Next.js")
+PATH_PATTERN = re.compile(r"(?<![\w/.-])(?:[\w.-]+/)+[\w.-]+\.\w+\b|(?<=`)[\w.-]+\.\w+(?=`)")
+
+_lock = threading.Lock()
+_entries = None  # feature_dir -> {"stamp", "data"}, loaded from SPEC_INDEX_FILE on first use
+_dirty = False
+_files = {}  # path -> (stamp, content) for read_feature_file
+stats = {"hits": 0, "parsed": 0}
+persist = True  # False keeps the index in memory (read-only commands such as --dry-run)
+
+def disable_persistence():
+    """Read SPEC_INDEX_FILE but never write it for the rest of this process."""
+    global persist
+    persist = False
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def read_feature_file(feature_dir, filename):
+    """Read a spec file once per modification; later calls return the cached content."""
+    path = os.path.join(feature_dir, filename)
+    stamp = file_stamp(path)
+    if stamp is None:
+        raise FileNotFoundError(f"Missing {filename} in {feature_dir}")
+    with _lock:
+        cached = _files.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    with open(path, 'r') as f: content = f.read()
+    with _lock:
+        _files[path] = (stamp, content)
+    return content
+
+def parse_front_matter(text):
+    """Parse a minimal YAML front-matter block (scalars and lists) at the top of a markdown file."""
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != "---":
+        return {}
+
+    meta = {}
+    key = None
+    for line in lines[1:]:
+        stripped = line.strip()
+        if stripped == "---":
+            return meta
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key:
+            if not isinstance(meta.get(key), list):
+                meta[key] = []
+            meta[key].append(stripped[2:].strip().strip("'\""))
+        elif ":" in stripped:
+            key, value = stripped.split(":", 1)
+            key, value = key.strip(), value.strip()
+            if value.startswith("[") and value.endswith("]"):
+                meta[key] = [v.strip().strip("'\"") for v in value[1:-1].split(",") if v.strip()]
+            else:
+                meta[key] = value.strip("'\"") if value else []
+
+    # Unterminated block: treat as regular markdown
+    return {}
+
+def parse_tasks_text(text):
+    """
+    Parse tasks.md content into its phases.
+    Returns a list of {"name", "tasks"} where each task is {"id", "done", "parallel", "story", "description"}.
+    Task lines outside a "## Phase N" section are ignored.
+    """
+    phases = []
+    current = None
+    for line in text.splitlines():
+        header = PHASE_HEADER_PATTERN.match(line)
+        if header:
+            current = {"name": header.group(1).strip(), "tasks": []}
+            phases.append(current)
+            continue
+        if line.startswith("## "):
+            current = None
+            continue
+
+        match = TASK_LINE_PATTERN.match(line)
+        if match and current is not None:
+            current["tasks"].append({
+                "id": match.group(2),
+                "done": match.group(1) != " ",
+                "parallel": bool(match.group(3)),
+                "story": match.group(4),
+                "description": match.group(5).strip()
+            })
+    return phases
+
+def parse_feature(feature_dir):
+    """Parse a feature directory into the compact form stored in the index."""
+    def read(filename):
+        path = os.path.join(feature_dir, filename)
+        return read_feature_file(feature_dir, filename) if os.path.exists(path) else ""
+
+    spec, plan, tasks = read("spec.md"), read("plan.md"), read("tasks.md")
+
+    depends_on = parse_front_matter(plan).get("depends_on", [])
+    if isinstance(depends_on, str):
+        depends_on = [depends_on]
+
+    phases = parse_tasks_text(tasks)
+    paths = sorted({p for phase in phases for t in phase["tasks"] for p in PATH_PATTERN.findall(t["description"])})
+    return {
+        "depends_on": depends_on,
+        "phases": phases,
+        "paths": paths,
+        "priorities": {f"US{n}": p for n, p in STORY_PRIORITY_PATTERN.findall(spec)},
+    }
+
+def _load_entries():
+    """Load the on-disk index once per process. Caller holds _lock."""
+    global _entries
+    if _entries is not None:
+        return _entries
+    _entries = {}
+    if os.path.exists(SPEC_INDEX_FILE):
+        try:
+            with open(SPEC_INDEX_FILE, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                _entries = data.get("features", {})
+        except (IOError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable spec index {SPEC_INDEX_FILE}: {e}")
+    return _entries
+
+def _save_entries():
+    """Atomically write the index if anything changed since the last write."""
+    global _dirty
+    with _lock:
+        if not _dirty or not persist:
+            return
+        payload = json.dumps({"version": INDEX_VERSION, "features": _entries})
+        _dirty = False
+    try:
+        tmp_path = f"{SPEC_INDEX_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, SPEC_INDEX_FILE)
+    except IOError as e:
+        logger.warning(f"Failed to write spec index: {e}")
+
+def _lookup(feature_dir):
+    """Return the index entry of one feature, reparsing it when any indexed file's mtime or size changed."""
+    global _dirty
+    key = os.path.normpath(feature_dir)
+    stamp = {f: file_stamp(os.path.join(feature_dir, f)) for f in INDEXED_FILES}
+    with _lock:
+        entry = _load_entries().get(key)
+        if entry and entry["stamp"] == stamp:
+            stats["hits"] += 1
+            return entry["data"]
+
+    data = parse_feature(feature_dir)
+    with _lock:
+        _entries[key] = {"stamp": stamp, "data": data}
+        _dirty = True
+        stats["parsed"] += 1
+    return data
+
+def load_feature(feature_dir):
+    """Parsed form of one feature: {"depends_on", "phases", "paths", "priorities"}."""
+    data = _lookup(feature_dir)
+    _save_entries()
+    return data
+
+def load_index(specs_root):
+    """Parsed form of every feature directory in specs_root, keyed by feature name in sorted order."""
+    names = sorted(e.name for e in os.scandir(specs_root) if e.is_dir())
+    index = {name: _lookup(os.path.join(specs_root, name)) for name in names}
+    _save_entries()
+    return index
+
+def parse_tasks(tasks_md_path):
+    """Phases of a tasks.md file (see parse_tasks_text), served from the index."""
+    if not os.path.exists(tasks_md_path):
+        return []
+    return load_feature(os.path.dirname(tasks_md_path))["phases"]
+
+def get_pending_tasks(tasks_md_path):
+    """Return the pending task IDs of a tasks.md file in order."""
+    return [t["id"] for phase in parse_tasks(tasks_md_path) for t in phase["tasks"] if not t["done"]]
+
+def format_spec_list(index):
+    """Render one line per feature for 'specs list'."""
+    lines = [f"{'FEATURE':<40} {'PHASES':>6} {'DONE':>9} {'[P]':>5}  DEPENDS ON"]
+    for name, data in index.items():
+        tasks = [t for phase in data["phases"] for t in phase["tasks"]]
+        done = sum(1 for t in tasks if t["done"])
+        parallel = sum(1 for t in tasks if t["parallel"])
+        lines.append(f"{name:<40} {len(data['phases']):>6} {f'{done}/{len(tasks)}':>9} {parallel:>5}  {', '.join(data['depends_on']) or '-'}")
+    return "\n".join(lines)
+
+def format_spec_stats(index, elapsed):
+    """Render corpus-wide totals for 'specs stats'."""
+    tasks = [t for data in index.values() for phase in data["phases"] for t in phase["tasks"]]
+    priorities = {}
+    for data in index.values():
+        for priority in data["priorities"].values():
+            priorities[priority] = priorities.get(priority, 0) + 1
+
+    lines = [
+        f"Features:           {len(index)}",
+        f"Phases:             {sum(len(d['phases']) for d in index.values())}",
+        f"Tasks:              {len(tasks)} ({sum(1 for t in tasks if t['done'])} done, {sum(1 for t in tasks if t['parallel'])} [P])",
+        f"User stories:       {len({(n, t['story']) for n, d in index.items() for p in d['phases'] for t in p['tasks'] if t['story']})}",
+        f"Story priorities:   {', '.join(f'{p}={c}' for p, c in sorted(priorities.items())) or '-'}",
+        f"Referenced paths:   {len({p for d in index.values() for p in d['paths']})}",
+        f"Dependencies:       {sum(len(d['depends_on']) for d in index.values())}",
+        f"Index:              {stats['hits']} cached, {stats['parsed']} parsed in {elapsed * 1000:.1f} ms",
+    ]
+    return "\n".join(lines)
+
+def index_report(specs_root, action):
+    """Build the output of the 'specs list' / 'specs stats' command."""
+    started = time.perf_counter()
+    index = load_index(specs_root)
+    if action == "stats":
+        return format_spec_stats(index, time.perf_counter() - started)
+    return format_spec_list(index)
@@ -1,48 +1,189 @@
 import json
 import os
 import re
+import copy
+import time
+import threading
+from contextlib import contextmanager
 from src.utils import logger
+from src import history
+from src.tracing import traced
 
-STATE_FILE = "state.json"
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
 
-def load_state():
-    """Load the orchestrator state from state.json."""
-    if not os.path.exists(STATE_FILE):
-        return {
-            "last_successful_branch": "main",
-            "current_phase": "features",
-            "features": {},
-            "polish": {
-                "logs": {"status": "pending"},
-                "errors": {"status": "pending"},
-                "hinting": {"status": "pending"},
-                "tests": {"status": "pending"}
-            }
+STATE_FILE = "state.json"  # Compacted snapshot
+JOURNAL_FILE = "state.journal.jsonl"  # Append-only transitions since the snapshot
+LOCK_FILE = "state.lock"
+JOURNAL_COMPACT_EVERY = 50  # journal entries between snapshots
+
+# Guards state mutation and persistence when several features run concurrently
+STATE_LOCK = threading.RLock()
+
+# What this process last wrote (or read), used to journal only the differences
+persisted_state = {}
+journal_entries = 0
+
+def default_state():
+    """Return the initial state for a fresh run."""
+    return {
+        "last_successful_branch": "main",
+        "current_phase": "features",
+        "features": {},
+        "polish": {
+            "logs": {"status": "pending"},
+            "errors": {"status": "pending"},
+            "hinting": {"status": "pending"},
+            "tests": {"status": "pending"}
         }
-    
-    try:
+    }
+
+@contextmanager
+def file_lock():
+    """Hold an exclusive advisory lock on LOCK_FILE so concurrent processes serialize state I/O."""
+    with open(LOCK_FILE, 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def diff_state(old, new, path=()):
+    """Return the journal operations that turn old into new (dicts recurse, other values are replaced)."""
+    ops = []
+    for key, value in new.items():
+        if key not in old:
+            ops.append({"op": "set", "path": list(path) + [key], "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            ops.extend(diff_state(old[key], value, path + (key,)))
+        elif value != old[key]:
+            ops.append({"op": "set", "path": list(path) + [key], "value": value})
+    for key in old:
+        if key not in new:
+            ops.append({"op": "del", "path": list(path) + [key]})
+    return ops
+
+def apply_ops(state, ops):
+    """Apply journal operations to state in place."""
+    for op in ops:
+        *parents, key = op["path"]
+        target = state
+        for part in parents:
+            target = target.setdefault(part, {})
+        if op["op"] == "set":
+            target[key] = op["value"]
+        else:
+            target.pop(key, None)
+
+def read_persisted_state():
+    """Rebuild the on-disk state by replaying the journal over the last snapshot (caller holds the file lock)."""
+    state = {}
+    if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             state = json.load(f)
-            # Ensure new fields exist for backward compatibility if needed
-            if "current_phase" not in state: state["current_phase"] = "features"
-            if "features" not in state: state["features"] = state.get("tasks", {}) # migration
-            if "polish" not in state:
-                state["polish"] = {
-                    "logs": {"status": "pending"},
-                    "errors": {"status": "pending"},
-                    "hinting": {"status": "pending"},
-                    "tests": {"status": "pending"}
-                }
-            return state
-    except (json.JSONDecodeError, IOError) as e:
+
+    entries = 0
+    if os.path.exists(JOURNAL_FILE):
+        with open(JOURNAL_FILE, 'rb') as f:
+            data = f.read()
+
+        valid_bytes = 0
+        for line_number, line in enumerate(data.splitlines(keepends=True), start=1):
+            try:
+                entry = json.loads(line) if line.strip() else None
+            except json.JSONDecodeError:
+                entry = None
+            if line.strip() and (entry is None or not line.endswith(b"\n")):
+                # A torn final line means the process died mid-append; that transition was never committed
+                logger.warning(f"Discarding incomplete journal entry at {JOURNAL_FILE}:{line_number}")
+                os.truncate(JOURNAL_FILE, valid_bytes)
+                break
+            if entry:
+                apply_ops(state, entry["ops"])
+                entries += 1
+            valid_bytes += len(line)
+    return state, entries
+
+def read_state_snapshot(root="."):
+    """Read-only view of the state stored in root, for observers such as the daemon (a torn journal tail is skipped, not repaired)."""
+    state = {}
+    try:
+        with open(os.path.join(root, STATE_FILE), 'r') as f:
+            state = json.load(f)
+    except (IOError, ValueError):
+        pass
+
+    try:
+        with open(os.path.join(root, JOURNAL_FILE), 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    apply_ops(state, json.loads(line)["ops"])
+    except (IOError, ValueError, KeyError):
+        pass
+    return state
+
+def compact_journal():
+    """Fold the journal into an atomically-renamed snapshot and truncate it (caller holds the file lock)."""
+    global journal_entries
+    state, _ = read_persisted_state()
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, STATE_FILE)
+    # Replaying ops over the new snapshot is idempotent, so a crash before truncation is harmless
+    with open(JOURNAL_FILE, 'w') as f:
+        os.fsync(f.fileno())
+    journal_entries = 0
+
+def load_state():
+    """Load the orchestrator state by replaying the journal over the state.json snapshot."""
+    global persisted_state, journal_entries
+    try:
+        with STATE_LOCK, file_lock():
+            state, journal_entries = read_persisted_state()
+            persisted_state = copy.deepcopy(state)
+    except (json.JSONDecodeError, KeyError, IOError) as e:
         logger.error(f"Failed to load state: {e}")
         raise RuntimeError("Cannot proceed: state file is missing or corrupted.")
 
+    if not state:
+        return default_state()
+
+    # Ensure new fields exist for backward compatibility if needed
+    if "current_phase" not in state: state["current_phase"] = "features"
+    if "features" not in state: state["features"] = state.get("tasks", {}) # migration
+    if "polish" not in state:
+        state["polish"] = default_state()["polish"]
+    return state
+
+@traced("save_state")
 def save_state(state):
-    """Save the orchestrator state to state.json."""
+    """Append the changes since the last save to the journal (fsync'd), compacting periodically."""
+    global persisted_state, journal_entries
     try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=2)
+        with STATE_LOCK:
+            ops = diff_state(persisted_state, state)
+            if not ops:
+                return
+            line = json.dumps({"ts": time.time(), "ops": ops})
+            with file_lock():
+                with open(JOURNAL_FILE, 'a') as f:
+                    f.write(line + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                persisted_state = copy.deepcopy(state)
+                journal_entries += 1
+                if journal_entries >= JOURNAL_COMPACT_EVERY:
+                    compact_journal()
+            history.record_state(state)
     except IOError as e:
         logger.error(f"Failed to save state: {e}")
         raise
@@ -59,7 +200,7 @@ def sync_task_to_md(task_id, tasks_md_path, completed=True):
 
         marker = "[x]" if completed else "[ ]"
         # Match - [ ] T001 or - [x] T001
-        pattern = rf"- \[ [x ] \] {task_id}"
+        pattern = rf"- \[[x ]\] {task_id}\b"
         replacement = f"- {marker} {task_id}"
         
         new_content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
@@ -71,20 +212,3 @@ def sync_task_to_md(task_id, tasks_md_path, completed=True):
     except Exception as e:
         logger.error(f"Failed to sync task to markdown: {e}")
         raise
-
-def get_pending_tasks(tasks_md_path):
-    """Parse tasks.md and return a list of pending task IDs in order."""
-    if not os.path.exists(tasks_md_path):
-        return []
-    
-    pending = []
-    try:
-        with open(tasks_md_path, 'r') as f:
-            for line in f:
-                match = re.search(r"- \[ \] (T\d+)", line)
-                if match:
-                    pending.append(match.group(1))
-    except Exception as e:
-        logger.error(f"Error parsing tasks file: {e}")
-    
-    return pending
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import inspect
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from src.utils import logger
+
+# Off by default: span() then returns a shared no-op context and counters return immediately
+enabled = False
+
+_lock = threading.Lock()
+_events = []
+_counters = {}
+_span_totals = {}
+_origin_ns = time.perf_counter_ns()
+_NULL_SPAN = nullcontext()
+
+def enable():
+    """Start collecting spans and counters for this process."""
+    global enabled
+    enabled = True
+
+@contextmanager
+def _recorded_span(name, attrs):
+    start = time.perf_counter_ns()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter_ns() - start
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - _origin_ns) / 1000,
+            "dur": duration / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(attrs, error=error) if error else attrs
+        }
+        with _lock:
+            _events.append(event)
+            total = _span_totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += duration / 1e9
+
+def span(name, **attrs):
+    """Time a block as a trace span with optional attributes (shown as args in the trace viewer)."""
+    if not enabled:
+        return _NULL_SPAN
+    return _recorded_span(name, attrs)
+
+def traced(name):
+    """Decorator form of span() for plain and async functions."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled:
+                    return await fn(*args, **kwargs)
+                with _recorded_span(name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _recorded_span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(metric, amount=1, **labels):
+    """Increment a Prometheus-style counter."""
+    if not enabled:
+        return
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def export_chrome_trace(path):
+    """Write collected spans as Chrome trace-event JSON (open in Perfetto or chrome://tracing)."""
+    with _lock:
+        events = list(_events)
+    _write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    logger.info(f"Wrote {len(events)} trace events to {path}")
+
+def export_prometheus(path):
+    """Write counters and per-span timing totals in the Prometheus textfile format."""
+    def render_labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    with _lock:
+        counters = dict(_counters)
+        span_totals = {k: list(v) for k, v in _span_totals.items()}
+
+    lines = []
+    for metric in sorted({m for m, _ in counters}):
+        lines.append(f"# TYPE {metric} counter")
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f"{metric}{render_labels(labels)} {value}")
+
+    lines.append("# TYPE orchestrator_span_seconds summary")
+    for name, (calls, seconds) in sorted(span_totals.items()):
+        lines.append(f'orchestrator_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+        lines.append(f'orchestrator_span_seconds_count{{span="{name}"}} {calls}')
+
+    _write_atomic(path, "\n".join(lines) + "\n")
+    logger.info(f"Wrote metrics to {path}")
@@ -1,42 +1,114 @@
 import os
 import logging
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 logger = logging.getLogger("orchestrator")
 
+_environment_loaded = False
+
+def load_environment():
+    """Load .env into the environment. Done on first use rather than at import, since python-dotenv is slow to import."""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
 def get_env_var(name, required=True):
     """Retrieve environment variable or raise error if required."""
+    load_environment()
     value = os.getenv(name)
     if required and not value:
         raise EnvironmentError(f"Missing required environment variable: {name}")
     return value
 
 def setup_logging():
-    """Returns the logger instance."""
+    """Configure log output (called by the entry point, not at import) and return the logger instance."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        datefmt=LOG_DATE_FORMAT
+    )
     return logger
 
+# Logging constants (a run's records go through src/log_pipeline.py)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_DIR = "logs"  # one JSON-lines file per run
+LOG_KEEP_RUNS = 10  # older run logs are deleted when a run starts
+LOG_HEARTBEAT_INTERVAL = 300  # seconds between "still RUNNING" lines for an agent whose status is unchanged
+LOG_TABLE_ROWS = 20  # agents shown in the console status table
+
 # Polling and retry constants
-POLLING_INTERVAL = 5  # seconds
-MAX_POLLING_ATTEMPTS = 1200  # total 100 minutes (enough for 1h minimum)
+POLL_MIN_INTERVAL = 2  # seconds; used right after launch and after every status change
+POLL_MAX_INTERVAL = 60  # seconds; cap for the exponential backoff while status is unchanged
+POLL_BACKOFF_FACTOR = 1.5
+POLL_JITTER = 0.2  # +/- 20% randomization so concurrent agents don't poll in lockstep
+MONITOR_TIMEOUT = 6000  # seconds; total 100 minutes (enough for 1h minimum)
+FOLLOWUP_SETTLE_TIMEOUT = 60  # seconds to wait for an agent to leave FINISHED after a follow-up
+MAX_REPAIR_ROUNDS = 2  # verifier-feedback follow-ups sent to the same agent before giving up
+STALL_WINDOW = 0  # seconds without progress (status, summary, commits, [X] tasks) before an agent is aborted; 0 = off, enable with --stall-window
+STALL_CHECK_INTERVAL = 300  # minimum seconds between reads of an agent's branch
+STALL_MAX_RELAUNCHES = 1  # fresh agents launched for a stalled one before escalating
+WEBHOOK_FALLBACK_INTERVAL = 300  # seconds without a webhook callback before polling as a safety net
+WEBHOOK_PATH = "/webhook"
+
+# Startup reconciliation of the agents recorded in state
+RECONCILE_MAX_VERIFIERS = 4  # finished agents verified at once on resume
+RECONCILE_ADOPT_WINDOW = 600  # seconds after a launch intent in which an unrecorded agent may have been created
+RECONCILE_CLOCK_SKEW = 60  # seconds of tolerance between local and API clocks
+
+# Verification cache constants
+VERIFY_CACHE_DIR = ".verify_cache"
+VERIFY_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds
+VERIFY_CACHE_MAX_ENTRIES = 500
+
+# Local pre-verification of an agent's branch (only ambiguous results go to the LLM verifier)
+PRECHECK_MIN_DONE_RATIO = 0.5  # fail outright when fewer of the feature's tasks are marked [X]
+PRECHECK_EXCERPT_CHARS = 12000  # total diff excerpt sent to the verifier
+PRECHECK_EXCERPT_FILE_CHARS = 2000  # per changed file
 
+PROMPT_TOKEN_BUDGET = 6000  # tokens of spec context in a feature prompt; lower-ranked sections are omitted beyond it
+POLISH_PHASES = ["logs", "errors", "hinting", "tests"]  # run in this order after all features
+
+SPEC_INDEX_FILE = ".spec_index.json"  # parsed specs/ cache, invalidated by file mtime and size
+HISTORY_DB = "history.db"  # SQLite run history used by the 'history' command
+
+# Daemon mode (python src/main.py daemon)
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8790  # override with ORCHESTRATOR_DAEMON_PORT
+DAEMON_MAX_AGENTS = 4  # global limit on concurrently running agents across all jobs
+DAEMON_CANCEL_GRACE = 10  # seconds a cancelled job gets to exit before it is killed
+# Environment a thin client forwards with a job (the daemon's own environment is not per-repo)
+DAEMON_FORWARDED_ENV = [
+    "GITHUB_REPO_URL", "CURSOR_API_KEY", "OPENAI_API_KEY", "CURSOR_API_URL", "OPENAI_BASE_URL",
+    "CURSOR_AGENT_MODEL", "SKIP_VERIFICATION", "ORCHESTRATOR_HISTORY_DB", "WEBHOOK_PUBLIC_URL", "WEBHOOK_SECRET", "WEBHOOK_BIND_HOST",
+]
+
+# HTTP client constants
+HTTP_TIMEOUT = 30  # seconds per request
+HTTP_MAX_RETRIES = 5  # retries for connection errors, 429 and 5xx
+HTTP_BACKOFF_BASE = 1  # seconds; doubled on every retry
+HTTP_BACKOFF_MAX = 60  # seconds; also caps Retry-After
+RATE_LIMIT_PER_SECOND = 2  # sustained requests/second shared by all in-flight agents
+RATE_LIMIT_BURST = 10
+
+import shlex
+import tempfile
 import subprocess
+import threading
+from contextlib import contextmanager
+
+# Serializes local git operations (fetch/merge/commit) across concurrent workflows
+GIT_LOCK = threading.RLock()
 
-def run_command(cmd):
-    """Run a shell command and return the output."""
+def run_command(cmd, quiet=False, cwd=None):
+    """Run a shell command (in cwd) and return the output. With quiet, failures are raised without logging."""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, check=True)
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, check=True, cwd=cwd)
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed: {cmd}\nError: {e.stderr}")
+        if not quiet:
+            logger.error(f"Command failed: {cmd}\nError: {e.stderr}")
         raise
 
 def get_current_branch():
@@ -48,6 +120,90 @@ def checkout_branch(branch_name, create=False):
     flag = "-b" if create else ""
     run_command(f"git checkout {flag} {branch_name}")
 
-def push_branch(branch_name):
+def push_branch(branch_name, cwd=None):
     """Push the branch to origin."""
-    run_command(f"git push origin {branch_name}")
+    run_command(f"git push origin {branch_name}", cwd=cwd)
+
+def commit_paths(message, paths, cwd=None):
+    """Stage and commit only the given paths, if they changed."""
+    quoted = " ".join(shlex.quote(p) for p in paths)
+    if run_command(f"git status --porcelain -- {quoted}", cwd=cwd):
+        run_command(f"git add -- {quoted}", cwd=cwd)
+        run_command(f"git commit -m {shlex.quote(message)} -- {quoted}", cwd=cwd)
+
+def is_git_clone():
+    """Whether the current directory is inside a git work tree with an 'origin' remote."""
+    try:
+        run_command("git remote get-url origin", quiet=True)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+@contextmanager
+def worktree():
+    """
+    A temporary git worktree of the current repository, removed afterwards. Merges and commits run
+    there so the user's checkout (branch, index and untracked files) is never touched. Yields its path.
+    Raises RuntimeError outside a clone of the target repository.
+    """
+    if not is_git_clone():
+        raise RuntimeError(f"Merging agent branches needs a clone of the target repository, but {os.getcwd()} is not a git checkout with an 'origin' remote.")
+    path = tempfile.mkdtemp(prefix="orchestrator-worktree-")
+    run_command(f"git worktree add --quiet --detach {shlex.quote(path)}")
+    try:
+        yield path
+    finally:
+        run_command(f"git worktree remove --force {shlex.quote(path)}", quiet=True)
+
+def merge_branches(base_branch, branches, target_branch, skip_conflicts=False, cwd=None):
+    """
+    Merge remote branches, in order, on top of base_branch into a local target_branch (not pushed),
+    checked out in cwd (a worktree()).
+    A conflicting merge is aborted; it re-raises unless skip_conflicts is set.
+    Returns the list of branches skipped because of conflicts.
+    """
+    run_command("git fetch origin", cwd=cwd)
+    run_command(f"git checkout --ignore-other-worktrees -B {target_branch} origin/{base_branch}", cwd=cwd)
+    conflicted = []
+    for branch in branches:
+        try:
+            run_command(f"git merge --no-edit origin/{branch}", cwd=cwd)
+        except subprocess.CalledProcessError:
+            run_command("git merge --abort", cwd=cwd)
+            if not skip_conflicts:
+                raise
+            logger.warning(f"Merge of {branch} into {target_branch} conflicts; skipping it.")
+            conflicted.append(branch)
+    return conflicted
+
+def fetch_branches(branches):
+    """Update origin/<branch> for each branch without touching the working tree."""
+    with GIT_LOCK:
+        run_command(f"git fetch --quiet origin {' '.join(branches)}", quiet=True)
+
+def rev_parse(ref):
+    """Commit SHA that ref points to."""
+    return run_command(f"git rev-parse {ref}", quiet=True)
+
+def list_files(ref):
+    """Paths of every file in ref's tree."""
+    return run_command(f"git ls-tree -r --name-only {ref}", quiet=True).splitlines()
+
+def show_file(ref, path):
+    """Content of path at ref, or None if it does not exist there."""
+    try:
+        return run_command(f"git show {ref}:{path}", quiet=True)
+    except subprocess.CalledProcessError:
+        return None
+
+def diff_numstat(base_ref, ref):
+    """[(path, insertions, deletions)] for the changes on ref since it forked from base_ref. Binary files count 0."""
+    stats = []
+    for line in run_command(f"git diff --numstat {base_ref}...{ref}", quiet=True).splitlines():
+        added, deleted, path = line.split("\t", 2)
+        stats.append((path, int(added) if added.isdigit() else 0, int(deleted) if deleted.isdigit() else 0))
+    return stats
+
+def diff_text(base_ref, ref, paths):
+    """Unified diff of paths on ref since it forked from base_ref."""
+    return run_command(f"git diff {base_ref}...{ref} -- {' '.join(shlex.quote(p) for p in paths)}", quiet=True)
@@ -1,20 +1,120 @@
+import os
 import json
-from openai import OpenAI
-from src.utils import get_env_var, logger
+import time
+import hashlib
+from src.tracing import traced, count
+from src.utils import get_env_var, logger, VERIFY_CACHE_DIR, VERIFY_CACHE_MAX_AGE, VERIFY_CACHE_MAX_ENTRIES
+from src.precheck import check_branch, decide, format_checks, diff_excerpt
 
-# ... existing code ...
+VERIFIER_MODEL = "gpt-4o-mini"
+# Bump whenever the verifier prompt changes so cached verdicts are not reused
+VERIFIER_PROMPT_VERSION = 2
 
-def run_verification(task_id, spec_content, agent_output_summary):
+cache_enabled = True
+
+def disable_verification_cache():
+    """Bypass the on-disk verdict cache for this process (--no-verify-cache)."""
+    global cache_enabled
+    cache_enabled = False
+
+def verification_cache_key(acceptance_criteria, agent_output_summary, evidence=None, revision=None, model=VERIFIER_MODEL):
+    """
+    Content hash of everything that determines a verdict. revision identifies the verified work
+    (the branch head SHA, or agent and repair round) so a repaired branch is judged afresh even
+    when the agent's summary did not change.
+    """
+    digest = hashlib.sha256()
+    for part in (str(VERIFIER_PROMPT_VERSION), model, acceptance_criteria, agent_output_summary, evidence or "", revision or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_cached_verdict(key):
+    """Return the cached (status, feedback) for key, or None if missing or expired."""
+    path = os.path.join(VERIFY_CACHE_DIR, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > VERIFY_CACHE_MAX_AGE:
+            return None
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data["status"], data["feedback"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def store_cached_verdict(key, status, feedback):
+    """Persist a verdict atomically, then evict expired and excess entries."""
+    try:
+        os.makedirs(VERIFY_CACHE_DIR, exist_ok=True)
+        path = os.path.join(VERIFY_CACHE_DIR, f"{key}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"status": status, "feedback": feedback, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
+        evict_cache()
+    except OSError as e:
+        logger.warning(f"Failed to write verification cache: {e}")
+
+def evict_cache():
+    """Drop entries older than VERIFY_CACHE_MAX_AGE and the oldest beyond VERIFY_CACHE_MAX_ENTRIES."""
+    entries = []
+    for name in os.listdir(VERIFY_CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(VERIFY_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+
+    entries.sort(reverse=True)
+    now = time.time()
+    for i, (mtime, path) in enumerate(entries):
+        if i >= VERIFY_CACHE_MAX_ENTRIES or now - mtime > VERIFY_CACHE_MAX_AGE:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+@traced("run_verification")
+def run_verification(task_id, spec_content, agent_output_summary, branch=None, base_branch=None, feature_dir=None, revision=None):
     """
     Orchestrate verification for a specific task.
+    Given the agent's branch and the branch it started from, local checks (tasks marked [X],
+    referenced paths, diff stats) settle clear passes and failures first. GPT-mini only judges
+    ambiguous results, and gets the check results and diff excerpts along with the summary.
+    revision keys the verdict cache when the branch head cannot be read locally.
     """
-    # In a real scenario, we might extract specific user stories/criteria from spec_content
-    # For now, we pass the relevant context to GPT-mini.
-    return verify_task_completion(f"Task {task_id}", spec_content, agent_output_summary)
+    evidence = None
+    checks = check_branch(branch, base_branch, feature_dir) if branch and base_branch else None
+    if checks:
+        verdict = decide(checks)
+        if verdict:
+            logger.info(f"Pre-verification of {branch}: {verdict[0]} ({verdict[1]})")
+            count("verifier_verdicts_total", tier="precheck", status=verdict[0])
+            return verdict
+        revision = checks["head"]
+        evidence = format_checks(checks)
+        excerpt = diff_excerpt(checks)
+        if excerpt:
+            evidence += f"\n\nDiff excerpts:\n{excerpt}"
+    return verify_task_completion(f"Task {task_id}", spec_content, agent_output_summary, evidence, revision)
+
+def verify_task_completion(task_description, acceptance_criteria, agent_output_summary, evidence=None, revision=None):
     """
     Use GPT-mini to verify if the Cloud Agent output satisfies the requirements.
+    evidence is the rendered output of the local branch checks, when they ran.
+    Verdicts are cached on disk by content hash unless the cache is disabled.
     Returns: (status, feedback) where status is 'pass' or 'fail'.
     """
+    cache_key = verification_cache_key(acceptance_criteria, agent_output_summary, evidence, revision)
+    if cache_enabled:
+        cached = load_cached_verdict(cache_key)
+        if cached:
+            logger.info(f"Verification cache hit: {cached[0]}")
+            count("verifier_verdicts_total", tier="cache", status=cached[0])
+            return cached
+
+    from openai import OpenAI  # heavy; only imported when a verification actually runs
     client = OpenAI(api_key=get_env_var("OPENAI_API_KEY"))
     
     prompt = f"""
@@ -29,7 +129,10 @@ def run_verification(task_id, spec_content, agent_output_summary):
     ### Agent Output Summary:
     {agent_output_summary}
     
-    Determine if ALL acceptance criteria are satisfied.
+    ### Local Checks of the Agent's Branch:
+    {evidence or "Not available; judge from the summary."}
+    
+    Determine if ALL acceptance criteria are satisfied. Prefer the local checks and diff excerpts over the summary where they disagree.
     Return a JSON response with:
     - "status": "pass" or "fail"
     - "feedback": A brief explanation of what was satisfied and what is missing (differential feedback).
@@ -37,7 +140,7 @@ def run_verification(task_id, spec_content, agent_output_summary):
     
     try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=VERIFIER_MODEL,
             messages=[
                 {"role": "system", "content": "You are a precise quality assurance assistant for a coding orchestrator."},
                 {"role": "user", "content": prompt}
@@ -46,13 +149,15 @@ def run_verification(task_id, spec_content, agent_output_summary):
         )
         
         result = response.choices[0].message.content
-        import json
         data = json.loads(result)
         
         status = data.get("status", "fail")
         feedback = data.get("feedback", "No feedback provided.")
         
         logger.info(f"Verification finished with status: {status}")
+        count("verifier_verdicts_total", tier="llm", status=status)
+        if cache_enabled:
+            store_cached_verdict(cache_key, status, feedback)
         return status, feedback
         
     except Exception as e:
@@ -0,0 +1,86 @@
+import time
+import hashlib
+import asyncio
+import subprocess
+from src.utils import logger, run_command, fetch_branches, STALL_WINDOW, STALL_CHECK_INTERVAL
+
+# Seconds without any progress signal change before an agent is aborted (0 disables the watchdog)
+stall_window = STALL_WINDOW
+
+# Called as listener(agent_id, point) whenever an agent's progress signals change
+_listener = None
+
+class AgentStalledError(RuntimeError):
+    """Raised when an agent shows no progress for longer than the stall window."""
+
+    def __init__(self, agent_id, idle_seconds):
+        super().__init__(f"Agent {agent_id} made no progress for {idle_seconds:.0f}s")
+        self.agent_id = agent_id
+        self.idle_seconds = idle_seconds
+
+def configure(window=None, listener=None):
+    """Set the stall window (--stall-window) and the progress listener for this process."""
+    global stall_window, _listener
+    if window is not None:
+        stall_window = window
+    _listener = listener
+
+def probe_branch(branch):
+    """
+    Read progress from the agent's pushed branch: its commit count and the number of [X] tasks
+    across specs/*/tasks.md. Returns None when the branch is not pushed yet or this is not a clone.
+    """
+    # origin/<branch> rather than FETCH_HEAD, which concurrent fetches of other branches overwrite
+    ref = f"origin/{branch}"
+    try:
+        fetch_branches([branch])
+        commits = int(run_command(f"git rev-list --count {ref}", quiet=True))
+        try:
+            counts = run_command(f"git grep -c -i -E '^- \\[x\\]' {ref} -- 'specs/*/tasks.md'", quiet=True)
+        except subprocess.CalledProcessError:
+            counts = ""  # git grep exits 1 when nothing matches
+        checked = sum(int(line.rsplit(":", 1)[1]) for line in counts.splitlines() if ":" in line)
+        return {"commits": commits, "checked": checked}
+    except (subprocess.CalledProcessError, ValueError, OSError) as e:
+        logger.debug(f"Progress probe of {branch} unavailable: {e}")
+        return None
+
+class ProgressTracker:
+    """Tracks one agent's progress signals and reports when it has stalled."""
+
+    def __init__(self, agent_id):
+        self.agent_id = agent_id
+        self.signature = None
+        self.last_change = time.monotonic()
+        self.last_probe = None
+        self.probe = None
+
+    def idle(self):
+        """Seconds since the progress signals last changed."""
+        return time.monotonic() - self.last_change
+
+    async def stalled(self, status_data):
+        """Update the signals from a fresh status read. Returns True once the stall window is exceeded."""
+        now = time.monotonic()
+        branch = status_data.get("target", {}).get("branchName")
+        if branch and (self.last_probe is None or now - self.last_probe >= STALL_CHECK_INTERVAL):
+            self.last_probe = now
+            self.probe = await asyncio.to_thread(probe_branch, branch) or self.probe
+
+        summary = status_data.get("summary") or ""
+        point = {
+            "status": status_data.get("status"),
+            "summary": hashlib.sha256(summary.encode("utf-8")).hexdigest()[:12] if summary else None,
+            **(self.probe or {})
+        }
+        if point != self.signature:
+            self.signature = point
+            self.last_change = now
+            if _listener:
+                _listener(self.agent_id, dict(point, at=int(time.time())))
+            return False
+
+        if stall_window and self.idle() > stall_window:
+            logger.warning(f"Agent {self.agent_id} shows no progress for {self.idle():.0f}s (stall window {stall_window}s).")
+            return True
+        return False
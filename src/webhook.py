@@ -0,0 +1,116 @@
+import hmac
+import json
+import hashlib
+import secrets
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.utils import logger, WEBHOOK_PATH
+from src import tracing
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+# Off until start_listener(); watch_agent then waits on callbacks and polls only as a fallback
+enabled = False
+# True once callbacks go to a configured public URL; a listener only this machine can reach keeps adaptive polling
+public = False
+
+_server = None
+_public_url = None
+_secret = None
+_lock = threading.Lock()
+_waiters = {}  # agent_id -> [(loop, asyncio.Event)]
+
+def sign(secret, body):
+    """HMAC-SHA256 signature of a request body, as sent in the X-Webhook-Signature header."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def verify_signature(secret, body, signature):
+    return bool(signature) and hmac.compare_digest(sign(secret, body), signature)
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accepts signed status-change callbacks and wakes the matching watchers."""
+
+    def log_message(self, format, *args):
+        logger.debug(f"Webhook listener: {format % args}")
+
+    def reply(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.split("?")[0] != WEBHOOK_PATH:
+            return self.reply(404)
+        if not verify_signature(_secret, body, self.headers.get(SIGNATURE_HEADER)):
+            logger.warning("Rejected webhook callback with an invalid signature.")
+            tracing.count("cursor_webhook_events_total", result="bad_signature")
+            return self.reply(401)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            tracing.count("cursor_webhook_events_total", result="bad_payload")
+            return self.reply(400)
+
+        agent_id = payload.get("id")
+        logger.info(f"Webhook: agent {agent_id} reported {payload.get('status')}")
+        tracing.count("cursor_webhook_events_total", result="accepted")
+        notify(agent_id)
+        self.reply(200)
+
+def start_listener(port, host="127.0.0.1", public_url=None, secret=None):
+    """
+    Start the callback listener on a background thread and enable webhook registration.
+    public_url is the address the Cursor API should call (e.g. a tunnel). Without it callbacks go to the
+    local listener, which the cloud cannot reach, so watchers keep polling at the adaptive rate.
+    Without a shared secret a random one is generated, so agents launched by earlier runs fall back to polling.
+    """
+    global enabled, public, _server, _public_url, _secret
+    _secret = secret or secrets.token_hex(32)
+    _server = ThreadingHTTPServer((host, port), WebhookHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    _public_url = public_url or f"http://127.0.0.1:{_server.server_port}{WEBHOOK_PATH}"
+    enabled, public = True, bool(public_url)
+    logger.info(f"Webhook listener on {host}:{_server.server_port}; callbacks expected at {_public_url}")
+    if not public:
+        logger.warning("WEBHOOK_PUBLIC_URL is not set, so only local callbacks arrive; agents are still polled at the adaptive rate.")
+
+def stop_listener():
+    global enabled, public, _server
+    if _server:
+        _server.shutdown()
+        _server.server_close()
+    enabled, public, _server = False, False, None
+
+def registration():
+    """The webhook block to pass to launch_agent, or None when webhooks are off."""
+    if not enabled:
+        return None
+    return {"url": _public_url, "secret": _secret}
+
+def subscribe(agent_id):
+    """Return an asyncio.Event on the running loop that is set whenever a callback for agent_id arrives."""
+    event = asyncio.Event()
+    with _lock:
+        _waiters.setdefault(agent_id, []).append((asyncio.get_running_loop(), event))
+    return event
+
+def unsubscribe(agent_id, event):
+    with _lock:
+        waiters = [w for w in _waiters.get(agent_id, []) if w[1] is not event]
+        if waiters:
+            _waiters[agent_id] = waiters
+        else:
+            _waiters.pop(agent_id, None)
+
+def notify(agent_id):
+    """Wake every watcher of agent_id (called from listener threads)."""
+    with _lock:
+        waiters = list(_waiters.get(agent_id, []))
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # watcher's loop already closed
+            pass
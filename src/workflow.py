@@ -0,0 +1,707 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import logger, get_env_var, merge_branches, push_branch, worktree, is_git_clone, GIT_LOCK, POLISH_PHASES, STALL_MAX_RELAUNCHES, RECONCILE_MAX_VERIFIERS
+from src.orchestrator import monitor_agent, monitor_agents, monitor_agent_alongside
+from src.prompts import assemble_feature_prompt, assemble_polish_prompt, assemble_repair_prompt, assemble_reconcile_prompt, feature_input_hash
+from src.cursor_api import launch_agent, add_followup, stop_agent
+from src.verifier import run_verification, disable_verification_cache
+from src.state_manager import load_state, save_state, STATE_LOCK
+from src.spec_index import read_feature_file
+from src.phase_runner import run_feature_fanout, reopen_last_phase
+from src.prompt_budget import set_token_budget
+from src import history, tracing, webhook, watchdog, log_pipeline
+from src.log_pipeline import log_context, log_fields
+from src.reconcile import record_launch_intent, record_launched, clear_launch, adopt_launches, plan_resume, release_agent, format_resume_plan, speculation_status, reset_speculative
+from src.tracing import traced
+from src.scheduler import list_features, build_dependency_graph, topological_order, run_features_parallel, plan_rebuild, invalidate_features
+
+def launch_workflow_agent(name, prompt, repo_url, state, model=None, source_ref=None):
+    """Launch the agent for a workflow step and return its ID."""
+    source_ref = source_ref or state.get("last_successful_branch", "main")
+    logger.info(f"Launching agent '{name}' from base: {source_ref}...")
+    
+    # Recorded on both sides of the call so a crash in between leaves an agent the next run can adopt
+    record_launch_intent(state, name, repo_url, source_ref)
+    result = launch_agent(name, prompt, repo_url, source_ref=source_ref, model=model, webhook=webhook.registration())
+    agent_id = result.get("id")
+    record_launched(state, name, agent_id)
+    logger.info(f"Agent launched successfully! ID: {agent_id}")
+    history.record_launch(agent_id, name, source_ref)
+    return agent_id
+
+def verify_workflow(name, agent_id, status_data, state, verifier_context=None, no_verify=False, repair_rounds=0, on_repair=None, update_base=True, feature_dir=None, base_branch=None):
+    """
+    Verify a FINISHED agent's output. With feature_dir its branch is also checked against the feature's tasks.md,
+    diffed against base_branch (default: the branch the agent started from).
+    On a verification failure the verifier's feedback is sent back to the same agent as a
+    follow-up, up to repair_rounds times. on_repair(agent_id, round_info) is called after each follow-up.
+    With update_base the passing branch becomes the last successful branch.
+    Returns (success, feedback, branch, rounds_used).
+    """
+    round_number = 0
+    while True:
+        output_summary = status_data.get("summary", "Agent finished execution.")
+        
+        # Verification
+        if no_verify:
+            logger.info("Verification skipped (--no-verify or SKIP_VERIFICATION=true).")
+            v_status, v_feedback = "pass", "Verification skipped."
+        else:
+            logger.info("Starting verification via GPT-mini...")
+            started_at = time.time()
+            # verifier_context should be the spec content for features or polish goal for polish
+            v_status, v_feedback = run_verification(
+                name, verifier_context or "General verification", output_summary,
+                branch=status_data.get("target", {}).get("branchName"), base_branch=base_branch or status_data.get("source", {}).get("ref"),
+                feature_dir=feature_dir, revision=f"{agent_id}#{round_number}" if agent_id else None
+            )
+            history.record_verification(agent_id, name, round_number, v_status, v_feedback, started_at)
+        
+        if v_status == "pass" or round_number >= repair_rounds:
+            break
+
+        round_number += 1
+        logger.warning(f"Workflow '{name}' failed verification; sending feedback to agent {agent_id} (repair round {round_number}/{repair_rounds}).")
+        add_followup(agent_id, assemble_repair_prompt(v_feedback, round_number))
+        if on_repair:
+            on_repair(agent_id, {"round": round_number, "feedback": v_feedback})
+
+        # Ignore the stale FINISHED status of the previous round
+        status_data = monitor_agent(agent_id, await_restart=True)
+    
+    new_branch = status_data.get("target", {}).get("branchName")
+    if v_status == "pass":
+        logger.info(f"Workflow '{name}' PASSED.")
+        if new_branch and update_base:
+            with STATE_LOCK:
+                state["last_successful_branch"] = new_branch
+            logger.info(f"Updated last successful branch to: {new_branch}")
+        return True, v_feedback, new_branch, round_number
+    else:
+        logger.error(f"Workflow '{name}' FAILED: {v_feedback}")
+        return False, v_feedback, new_branch, round_number
+
+def monitor_with_relaunch(name, agent_id, prompt, repo_url, state, model=None, source_ref=None, guard=None):
+    """
+    Monitor agent_id (alongside guard, see monitor_agent_alongside), replacing a stalled agent with a
+    fresh one from source_ref up to STALL_MAX_RELAUNCHES times.
+    Returns (agent_id, status_data, guard_result); re-raises AgentStalledError once relaunches are used up.
+    """
+    relaunches = 0
+    while True:
+        try:
+            with log_context(attempt=relaunches + 1):
+                if guard is None:
+                    return agent_id, monitor_agent(agent_id), True
+                return (agent_id,) + monitor_agent_alongside(agent_id, guard)
+        except watchdog.AgentStalledError as e:
+            if relaunches >= STALL_MAX_RELAUNCHES:
+                logger.error(f"Workflow '{name}' stalled {relaunches + 1} time(s); escalating as a failure.")
+                raise
+            relaunches += 1
+            logger.warning(f"{e}; relaunching '{name}' ({relaunches}/{STALL_MAX_RELAUNCHES}).")
+            agent_id = launch_workflow_agent(name, prompt, repo_url, state, model=model, source_ref=source_ref)
+
+def run_agent_workflow(name, prompt, repo_url, state, verifier_context=None, no_verify=False, model=None, existing_agent_id=None, source_ref=None, repair_rounds=0, on_repair=None, feature_dir=None, update_base=True):
+    """Common workflow for launching an agent and optionally verifying (and repairing) its output."""
+    
+    if existing_agent_id:
+        logger.info(f"Resuming polling for existing agent '{name}' (ID: {existing_agent_id})...")
+        agent_id = existing_agent_id
+    else:
+        agent_id = launch_workflow_agent(name, prompt, repo_url, state, model=model, source_ref=source_ref)
+    
+    # Monitor; a stalled agent is replaced by a fresh one, then escalated as a failure
+    try:
+        agent_id, status_data, _ = monitor_with_relaunch(name, agent_id, prompt, repo_url, state, model=model, source_ref=source_ref)
+    except watchdog.AgentStalledError as e:
+        return False, str(e), e.agent_id, None
+    
+    success, feedback, new_branch, _ = verify_workflow(
+        name, agent_id, status_data, state,
+        verifier_context=verifier_context, no_verify=no_verify,
+        repair_rounds=repair_rounds, on_repair=on_repair, update_base=update_base, feature_dir=feature_dir
+    )
+    return success, feedback, agent_id, new_branch
+
+def progress_recorder(state):
+    """Return a watchdog listener that appends each agent's progress points to state["progress"]."""
+    def record(agent_id, point):
+        with STATE_LOCK:
+            state.setdefault("progress", {}).setdefault(agent_id, []).append(point)
+            save_state(state)
+    return record
+
+def repair_recorder(state, section, key):
+    """Return an on_repair callback that persists each repair round under state[section][key]."""
+    def record(agent_id, round_info):
+        with STATE_LOCK:
+            entry = state[section].setdefault(key, {})
+            entry["agent_id"] = agent_id
+            entry.setdefault("repair_rounds", []).append(round_info)
+            save_state(state)
+    return record
+
+@log_fields(feature="feature_name")
+def process_feature(feature_name, feature_dir, repo_url, state, no_verify=False, model=None, source_ref=None, fanout=0, repair_rounds=0, chunked=False, update_base=True):
+    """Handle the implementation of a single feature. With update_base its passing branch becomes the last successful branch."""
+    feature_state = state["features"].get(feature_name, {})
+    
+    if feature_state.get("status") == "completed":
+        logger.info(f"Feature {feature_name} already completed.")
+        return True
+
+    # Inputs as of launch; stored on completion so later edits trigger a rebuild
+    input_hash = feature_input_hash(feature_dir)
+
+    if fanout or chunked:
+        # Resume from the original base when phase checkpoints exist
+        base_branch = feature_state.get("base_branch") if feature_state.get("phases") else None
+        base_branch = base_branch or source_ref or state.get("last_successful_branch", "main")
+
+        success, feedback, agent_ids, status_data = run_feature_fanout(
+            feature_name, feature_dir, repo_url, state, fanout,
+            model=model, source_ref=base_branch, chunked=chunked
+        )
+        branch = status_data["target"]["branchName"]
+        if success:
+            # Repairs go to the agent that pushed the final branch; a phase ending in a local merge has none
+            if repair_rounds and not status_data["id"]:
+                logger.warning(f"The last phase of {feature_name} ends with a merge, so there is no agent to send repair feedback to.")
+            success, feedback, branch, _ = verify_workflow(
+                f"Feature: {feature_name}", status_data["id"], status_data, state,
+                verifier_context=read_feature_file(feature_dir, "spec.md"), no_verify=no_verify,
+                repair_rounds=repair_rounds if status_data["id"] else 0, on_repair=repair_recorder(state, "features", feature_name),
+                update_base=update_base, feature_dir=feature_dir, base_branch=base_branch
+            )
+            if not success:
+                reopen_last_phase(state, feature_name, feature_dir, feedback)
+        with STATE_LOCK:
+            previous = state["features"][feature_name]
+            state["features"][feature_name] = {
+                "status": "completed" if success else "failed",
+                "agent_ids": agent_ids,
+                "last_feedback": feedback,
+                "base_branch": base_branch,
+                "branch": branch,
+                "input_hash": input_hash,
+                "phases": previous.get("phases", {}),
+                "repair_rounds": previous.get("repair_rounds", [])
+            }
+            save_state(state)
+        return success
+
+    # Resume logic: if agent_id exists but not completed, try to resume polling
+    existing_id = feature_state.get("agent_id")
+    base_branch = feature_state.get("base_branch") if existing_id else None
+    base_branch = base_branch or source_ref or state.get("last_successful_branch", "main")
+    
+    prompt = assemble_feature_prompt(feature_dir)
+    spec_content = read_feature_file(feature_dir, "spec.md")
+
+    success, feedback, agent_id, branch = run_agent_workflow(
+        f"Feature: {feature_name}", 
+        prompt, 
+        repo_url, 
+        state, 
+        verifier_context=spec_content, 
+        no_verify=no_verify,
+        model=model,
+        existing_agent_id=existing_id,
+        source_ref=base_branch,
+        repair_rounds=repair_rounds,
+        on_repair=repair_recorder(state, "features", feature_name),
+        feature_dir=feature_dir,
+        update_base=update_base
+    )
+    
+    record_feature_result(state, feature_name, success, feedback, agent_id, base_branch, branch, input_hash)
+    return success
+
+def record_feature_result(state, feature_name, success, feedback, agent_id, base_branch, branch, input_hash=None):
+    """Persist the outcome of a single-agent feature run."""
+    with STATE_LOCK:
+        previous = state["features"].get(feature_name, {})
+        state["features"][feature_name] = {
+            "status": "completed" if success else "failed",
+            "agent_id": agent_id,
+            "last_feedback": feedback,
+            "base_branch": base_branch,
+            "branch": branch,
+            "input_hash": input_hash,
+            "repair_rounds": previous.get("repair_rounds", []),
+            "invalidated_agents": previous.get("invalidated_agents", [])
+        }
+        clear_launch(state, f"Feature: {feature_name}")
+        save_state(state)
+
+def run_features_pipelined(features, specs_root, repo_url, state, no_verify=False, model=None, repair_rounds=0):
+    """
+    Run features in order, launching each one speculatively from the previous feature's branch as soon
+    as that agent FINISHES, while the previous verification runs in the background.
+    If that verification fails or needs repair rounds, the speculative agent is stopped, its state is
+    rolled back, and it is relaunched from the verified branch (or the run stops on failure).
+    """
+    queue = [f for f in features if state["features"].get(f, {}).get("status") != "completed"]
+    previous = None  # (feature, verification future, branch the next feature builds on)
+
+    with ThreadPoolExecutor(max_workers=1) as verifier_pool:
+        index = 0
+        while index < len(queue):
+            feature = queue[index]
+            feature_dir = os.path.join(specs_root, feature)
+            name = f"Feature: {feature}"
+            prior_entry = dict(state["features"].get(feature, {}))
+            spec_content = read_feature_file(feature_dir, "spec.md")
+            input_hash = feature_input_hash(feature_dir)
+
+            if previous:
+                base_branch = previous[2]
+                agent_id = launch_workflow_agent(name, assemble_feature_prompt(feature_dir), repo_url, state, model=model, source_ref=base_branch)
+                logger.info(f"Feature {feature} launched speculatively while {previous[0]} is being verified.")
+            elif prior_entry.get("agent_id") and prior_entry.get("status") != "failed":
+                base_branch = prior_entry.get("base_branch") or state.get("last_successful_branch", "main")
+                agent_id = prior_entry["agent_id"]
+                logger.info(f"Resuming polling for existing agent '{name}' (ID: {agent_id})...")
+            else:
+                base_branch = state.get("last_successful_branch", "main")
+                agent_id = launch_workflow_agent(name, assemble_feature_prompt(feature_dir), repo_url, state, model=model, source_ref=base_branch)
+
+            with STATE_LOCK:
+                state["features"][feature] = dict(prior_entry, status="running", agent_id=agent_id, base_branch=base_branch, speculative=previous is not None)
+                if previous:
+                    # What reconcile checks the speculation against if the run dies before it is settled
+                    state["features"][feature].update(speculative_on=previous[0], base_repairs=len(state["features"][previous[0]].get("repair_rounds", [])))
+                save_state(state)
+
+            # A stalled agent is relaunched from the same base as in the sequential loop
+            try:
+                with log_context(feature=feature):
+                    agent_id, status_data, speculation_valid = monitor_with_relaunch(
+                        name, agent_id, assemble_feature_prompt(feature_dir), repo_url, state,
+                        model=model, source_ref=base_branch, guard=previous[1] if previous else None
+                    )
+            except watchdog.AgentStalledError as e:
+                record_feature_result(state, feature, False, str(e), e.agent_id, base_branch, None, input_hash)
+                if previous:
+                    previous[1].result()  # let the previous feature's verification finish and record its result
+                return False
+            with STATE_LOCK:
+                state["features"][feature]["agent_id"] = agent_id
+                save_state(state)
+
+            if previous:
+                previous_completed = state["features"][previous[0]].get("status") == "completed"
+                if not speculation_valid:
+                    logger.warning(f"Verification of {previous[0]} invalidated speculative agent {agent_id} for {feature}. Rolling back.")
+                    if status_data is None:
+                        try:
+                            stop_agent(agent_id)
+                        except Exception as e:
+                            logger.warning(f"Could not stop speculative agent {agent_id}: {e}")
+                    with STATE_LOCK:
+                        prior_entry["invalidated_agents"] = prior_entry.get("invalidated_agents", []) + [agent_id]
+                        state["features"][feature] = prior_entry
+                        clear_launch(state, name)
+                        save_state(state)
+                    previous = None
+                    if not previous_completed:
+                        return False
+                    continue  # Relaunch the same feature from the verified branch
+
+            @log_fields(feature="feature")
+            def verify(feature=feature, agent_id=agent_id, status_data=status_data, base_branch=base_branch, spec_content=spec_content, input_hash=input_hash, feature_dir=feature_dir):
+                success, feedback, branch, rounds_used = verify_workflow(
+                    f"Feature: {feature}", agent_id, status_data, state,
+                    verifier_context=spec_content, no_verify=no_verify,
+                    repair_rounds=repair_rounds, on_repair=repair_recorder(state, "features", feature), feature_dir=feature_dir
+                )
+                record_feature_result(state, feature, success, feedback, agent_id, base_branch, branch, input_hash)
+                # The speculative successor is only valid if this branch was accepted unchanged
+                return success and rounds_used == 0
+
+            next_base = status_data.get("target", {}).get("branchName") or base_branch
+            previous = (feature, verifier_pool.submit(verify), next_base)
+            index += 1
+
+        if previous:
+            previous[1].result()
+            return state["features"][previous[0]].get("status") == "completed"
+    return True
+
+@log_fields(phase="phase_name")
+def process_polish(phase_name, repo_url, state, no_verify=False, model=None, repair_rounds=0):
+    """Handle a single polish phase."""
+    polish_state = state["polish"].get(phase_name, {})
+    
+    if polish_state.get("status") == "completed":
+        logger.info(f"Polish phase {phase_name} already completed.")
+        return True
+
+    # Resume logic
+    existing_id = polish_state.get("agent_id")
+
+    prompt = assemble_polish_prompt(phase_name)
+    success, feedback, agent_id, _ = run_agent_workflow(
+        f"Polish: {phase_name}", 
+        prompt, 
+        repo_url, 
+        state, 
+        verifier_context=f"Polish goal: {phase_name}", 
+        no_verify=no_verify,
+        model=model,
+        existing_agent_id=existing_id,
+        repair_rounds=repair_rounds,
+        on_repair=repair_recorder(state, "polish", phase_name)
+    )
+    
+    state["polish"][phase_name] = {
+        "status": "completed" if success else "failed",
+        "agent_id": agent_id,
+        "last_feedback": feedback,
+        "repair_rounds": state["polish"].get(phase_name, {}).get("repair_rounds", [])
+    }
+    clear_launch(state, f"Polish: {phase_name}")
+    save_state(state)
+    return success
+
+def run_polish_parallel(repo_url, state, merge_order, no_verify=False, model=None, repair_rounds=0):
+    """
+    Launch every pending polish phase at once from the same base branch, verify them concurrently,
+    then merge their branches locally in merge_order into orchestrator/polish. Branches that conflict
+    are handed to a single reconciliation agent. Returns True on success.
+    """
+    base_branch = state.get("last_successful_branch", "main")
+    pending = [p for p in merge_order if state["polish"].get(p, {}).get("status") != "completed"]
+
+    agents = {}
+    for phase in pending:
+        entry = state["polish"].get(phase, {})
+        if entry.get("agent_id") and entry.get("status") != "failed":
+            logger.info(f"Resuming polling for existing agent 'Polish: {phase}' (ID: {entry['agent_id']})...")
+            agents[phase] = entry["agent_id"]
+            base_branch = entry.get("base_branch") or base_branch
+        else:
+            agents[phase] = launch_workflow_agent(f"Polish: {phase}", assemble_polish_prompt(phase), repo_url, state, model=model, source_ref=base_branch)
+        with STATE_LOCK:
+            state["polish"][phase] = dict(entry, status="running", agent_id=agents[phase], base_branch=base_branch)
+            save_state(state)
+
+    results = asyncio.run(monitor_agents(list(agents.values())))
+
+    @log_fields(phase="phase")
+    def verify(phase):
+        status_data = results[agents[phase]]
+        if isinstance(status_data, Exception):
+            logger.error(f"Polish phase {phase} agent failed: {status_data}")
+            success, feedback, branch = False, str(status_data), None
+        else:
+            success, feedback, branch, _ = verify_workflow(
+                f"Polish: {phase}", agents[phase], status_data, state,
+                verifier_context=f"Polish goal: {phase}", no_verify=no_verify,
+                repair_rounds=repair_rounds, on_repair=repair_recorder(state, "polish", phase), update_base=False
+            )
+        with STATE_LOCK:
+            previous = state["polish"][phase]
+            state["polish"][phase] = {
+                "status": "completed" if success else "failed",
+                "agent_id": agents[phase],
+                "last_feedback": feedback,
+                "base_branch": base_branch,
+                "branch": branch,
+                "merged": False,
+                "repair_rounds": previous.get("repair_rounds", [])
+            }
+            clear_launch(state, f"Polish: {phase}")
+            save_state(state)
+        return success
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            if not all(list(pool.map(verify, pending))):
+                return False
+
+    unmerged = [p for p in merge_order if not state["polish"][p].get("merged", True)]
+    if not unmerged:
+        return True
+
+    target = "orchestrator/polish"
+    branches = [state["polish"][p]["branch"] for p in unmerged]
+    logger.info(f"Merging polish branches into {target} in order: {', '.join(unmerged)}")
+    with GIT_LOCK, worktree() as path:
+        conflicted = merge_branches(base_branch, branches, target, skip_conflicts=True, cwd=path)
+        push_branch(target, cwd=path)
+    final_branch = target
+
+    if conflicted:
+        logger.warning(f"Launching a reconciliation agent for conflicting branches: {', '.join(conflicted)}")
+        success, feedback, agent_id, branch = run_agent_workflow(
+            "Polish: reconcile", assemble_reconcile_prompt(conflicted), repo_url, state,
+            verifier_context=f"All of these polish branches are merged without conflicts: {', '.join(conflicted)}",
+            no_verify=no_verify, model=model, source_ref=target, repair_rounds=repair_rounds
+        )
+        if not success:
+            logger.error(f"Polish reconciliation failed: {feedback}")
+            return False
+        final_branch = branch or target
+
+    with STATE_LOCK:
+        for phase in unmerged:
+            state["polish"][phase]["merged"] = True
+        state["last_successful_branch"] = final_branch
+        save_state(state)
+    logger.info(f"Polish branches merged. Last successful branch: {final_branch}")
+    return True
+
+@traced("reconcile")
+def reconcile_workflow(state, specs_root, deps, no_verify=False, repair_rounds=0, parallel_polish=False, feature=None):
+    """
+    Startup reconciliation: adopt the agents of interrupted launches, poll every agent recorded in state
+    at once, verify the FINISHED ones concurrently and reset those that ended without finishing so they
+    are relaunched. Agents still running are left for the phase loops to resume.
+    Speculative --pipeline features are verified afterwards, in run order, and only once the feature they
+    built on passed unchanged; they are reset to pending when it did not.
+    With feature, only that feature's agent is reconciled.
+    """
+    for name, agent_id, how in adopt_launches(state):
+        logger.info(f"Adopted agent {agent_id} for '{name}' ({'ID recorded at launch' if how == 'recorded' else 'found in the agent list'}).")
+
+    plan = plan_resume(state, feature)
+    if not plan:
+        return
+    logger.info(format_resume_plan(plan))
+    with STATE_LOCK:
+        for item in plan:
+            if item["action"] == "relaunch":
+                release_agent(state, item)
+        save_state(state)
+
+    def verify(item):
+        section, key, agent_id = item["section"], item["key"], item["agent_id"]
+        with log_context(agent_id=agent_id, **{"feature" if section == "features" else "phase": key}):
+            try:
+                if section == "features":
+                    feature_dir = os.path.join(specs_root, key)
+                    success, feedback, branch, _ = verify_workflow(
+                        f"Feature: {key}", agent_id, item["status_data"], state,
+                        verifier_context=read_feature_file(feature_dir, "spec.md"), no_verify=no_verify,
+                        repair_rounds=repair_rounds, on_repair=repair_recorder(state, "features", key), update_base=False, feature_dir=feature_dir
+                    )
+                    record_feature_result(state, key, success, feedback, agent_id, state["features"][key].get("base_branch"), branch, feature_input_hash(feature_dir))
+                else:
+                    success, feedback, branch, _ = verify_workflow(
+                        f"Polish: {key}", agent_id, item["status_data"], state,
+                        verifier_context=f"Polish goal: {key}", no_verify=no_verify,
+                        repair_rounds=repair_rounds, on_repair=repair_recorder(state, "polish", key), update_base=False
+                    )
+                    with STATE_LOCK:
+                        previous = state["polish"][key]
+                        state["polish"][key] = {
+                            "status": "completed" if success else "failed",
+                            "agent_id": agent_id,
+                            "last_feedback": feedback,
+                            "repair_rounds": previous.get("repair_rounds", [])
+                        }
+                        if parallel_polish:
+                            # Merged by run_polish_parallel together with the other phases
+                            state["polish"][key].update(base_branch=previous.get("base_branch"), branch=branch, merged=False)
+                        save_state(state)
+            except Exception as e:
+                logger.error(f"Verification of {section}/{key} during reconciliation failed: {e}")
+                return None
+        return branch if success else None
+
+    finished = [item for item in plan if item["action"] == "verify"]
+    if not finished:
+        return
+    speculative = {item["key"]: item for item in finished if item["section"] == "features" and state["features"][item["key"]].get("speculative")}
+    independent = [item for item in finished if item["section"] != "features" or item["key"] not in speculative]
+    branches = {}
+    if independent:
+        with ThreadPoolExecutor(max_workers=min(len(independent), RECONCILE_MAX_VERIFIERS)) as pool:
+            branches = {(item["section"], item["key"]): branch for item, branch in zip(independent, pool.map(verify, independent))}
+
+    # A speculative feature builds on its predecessor, which may itself be speculative: settle them in run order
+    for key in [f for f in topological_order(deps) if f in speculative]:
+        entry = state["features"][key]
+        status = speculation_status(state, entry)
+        if status == "valid":
+            branches[("features", key)] = verify(speculative[key])
+        elif status == "invalid":
+            logger.warning(f"Speculative agent {entry['agent_id']} for {key} built on {entry.get('speculative_on')}, which did not pass unchanged. Resetting {key}.")
+            with STATE_LOCK:
+                reset_speculative(state, key, f"speculative base {entry.get('speculative_on')} was not accepted")
+                save_state(state)
+        else:
+            logger.info(f"Verification of speculative {key} waits for {entry.get('speculative_on')}, which is still running.")
+
+    # Advance the base as the sequential loops would have: along the completed prefix of the run order
+    order = [("features", f) for f in topological_order(deps)] + [("polish", p) for p in ([] if parallel_polish else POLISH_PHASES)]
+    with STATE_LOCK:
+        for section, key in order:
+            if state[section].get(key, {}).get("status") != "completed":
+                break
+            if branches.get((section, key)):
+                state["last_successful_branch"] = branches[(section, key)]
+        save_state(state)
+    logger.info(f"Reconciliation verified {len(branches)} of {len(finished)} finished agent(s). Last successful branch: {state['last_successful_branch']}")
+
+def integrate_features(state, deps, base_branch):
+    """
+    Merge every feature branch, in dependency order, on top of base_branch into orchestrator/features
+    and make it the last successful branch, so polish starts from the work of all parallel features.
+    Returns False when the merge cannot be made.
+    """
+    branches = []
+    for feature in topological_order(deps):
+        branch = state["features"].get(feature, {}).get("branch")
+        if branch and branch not in branches:
+            branches.append(branch)
+
+    target = "orchestrator/features"
+    logger.info(f"Merging {len(branches)} feature branches into {target}...")
+    try:
+        with GIT_LOCK, worktree() as path:
+            merge_branches(base_branch, branches, target, cwd=path)
+            push_branch(target, cwd=path)
+    except (subprocess.CalledProcessError, RuntimeError) as e:
+        logger.error(f"Could not merge the feature branches into {target}: {(getattr(e, 'stderr', None) or str(e)).strip()}")
+        return False
+    with STATE_LOCK:
+        state["last_successful_branch"] = target
+        save_state(state)
+    logger.info(f"Feature branches merged. Last successful branch: {target}")
+    return True
+
+def run_workflow(args, merge_order):
+    """Run the feature and polish phases for parsed CLI args (--dry-run and --plan are served by src.preview)."""
+    set_token_budget(args.prompt_budget)
+    REPO_URL = get_env_var("GITHUB_REPO_URL", required=True)
+    SKIP_VERIFICATION = args.no_verify or os.getenv("SKIP_VERIFICATION") == "true"
+    AGENT_MODEL = os.getenv("CURSOR_AGENT_MODEL") # Optional
+    if args.no_verify_cache:
+        disable_verification_cache()
+    if args.trace or args.metrics:
+        tracing.enable()
+    if args.history_db:
+        history.enable(args.history_db, " ".join(sys.argv[1:]))
+    log_path = log_pipeline.start(args.console)
+    logger.info(f"Logging this run to {log_path}")
+    if args.webhook_port is not None:
+        webhook.start_listener(args.webhook_port, host=os.getenv("WEBHOOK_BIND_HOST", "127.0.0.1"), public_url=os.getenv("WEBHOOK_PUBLIC_URL"), secret=os.getenv("WEBHOOK_SECRET"))
+
+    run_status = "failed"
+    try:
+        # These modes merge agent branches locally, so check for a clone before any agent is launched
+        if ((args.parallel > 1 and not args.feature) or args.fanout or args.parallel_polish) and not is_git_clone():
+            logger.error("--parallel, --fanout and --parallel-polish merge agent branches locally: run the orchestrator inside a clone of the target repository.")
+            sys.exit(1)
+
+        state = load_state()
+        specs_root = "specs"
+        watchdog.configure(args.stall_window, progress_recorder(state))
+
+        # If agent-id is provided manually via CLI, inject it into the state for the target feature
+        if args.agent_id:
+            if not args.feature:
+                # Try to detect which feature to attach the ID to if not provided
+                features = list_features(specs_root)
+                # Filter out completed ones if possible, or just pick the first one
+                target_feature = None
+                for f in features:
+                    if state["features"].get(f, {}).get("status") != "completed":
+                        target_feature = f
+                        break
+                
+                if not target_feature:
+                    logger.error("No active feature found to attach agent-id. Please use --feature <name> --agent-id <id>")
+                    sys.exit(1)
+                
+                logger.info(f"Attaching manual agent-id {args.agent_id} to feature: {target_feature}")
+                if target_feature not in state["features"]: state["features"][target_feature] = {}
+                state["features"][target_feature]["agent_id"] = args.agent_id
+            else:
+                logger.info(f"Attaching manual agent-id {args.agent_id} to feature: {args.feature}")
+                if args.feature not in state["features"]: state["features"][args.feature] = {}
+                state["features"][args.feature]["agent_id"] = args.agent_id
+            
+            save_state(state)
+
+        # Relaunch completed features whose spec inputs changed, plus their dependents
+        deps = build_dependency_graph(specs_root, list_features(specs_root))
+        stale = invalidate_features(state, plan_rebuild(deps, state, specs_root))
+        if stale:
+            logger.info(f"Spec inputs changed; rebuilding: {', '.join(stale)}")
+            save_state(state)
+        if not args.no_reconcile:
+            reconcile_workflow(state, specs_root, deps, no_verify=SKIP_VERIFICATION, repair_rounds=args.repair_rounds, parallel_polish=args.parallel_polish, feature=args.feature)
+
+        # Phase 1: Features
+        if state["current_phase"] == "features":
+            logger.info("--- PHASE 1: FEATURES ---")
+
+            if args.parallel > 1 and not args.feature:
+                logger.info(f"Running features with up to {args.parallel} concurrent agents.")
+                def run_feature(feature, source_ref):
+                    return process_feature(
+                        feature, os.path.join(specs_root, feature), REPO_URL, state,
+                        no_verify=SKIP_VERIFICATION, model=AGENT_MODEL, source_ref=source_ref, fanout=args.fanout, repair_rounds=args.repair_rounds, chunked=args.chunked,
+                        update_base=False
+                    )
+
+                root_branch = state.get("last_successful_branch", "main")
+                if not run_features_parallel(deps, run_feature, state, args.parallel):
+                    logger.error("Parallel feature run failed. Stopping.")
+                    sys.exit(1)
+                if not integrate_features(state, deps, root_branch):
+                    sys.exit(1)
+            elif args.pipeline and not args.feature and not args.fanout and not args.chunked:
+                logger.info("Running features in pipelined mode (speculative launch during verification).")
+                if not run_features_pipelined(topological_order(deps), specs_root, REPO_URL, state, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL, repair_rounds=args.repair_rounds):
+                    logger.error("Pipelined feature run failed. Stopping.")
+                    sys.exit(1)
+            else:
+                for feature in topological_order(deps):
+                    if args.feature and feature != args.feature:
+                        continue
+                    
+                    feature_dir = os.path.join(specs_root, feature)
+                    if not process_feature(feature, feature_dir, REPO_URL, state, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL, fanout=args.fanout, repair_rounds=args.repair_rounds, chunked=args.chunked):
+                        logger.error(f"Feature {feature} implementation failed. Stopping.")
+                        sys.exit(1)
+            
+            if not args.feature:
+                state["current_phase"] = "polish"
+                save_state(state)
+                logger.info("All features completed. Moving to Phase 2: Polish.")
+
+        # Phase 2: Polish
+        if state["current_phase"] == "polish" and not args.feature:
+            logger.info("--- PHASE 2: POLISH ---")
+            if args.parallel_polish:
+                if not run_polish_parallel(REPO_URL, state, merge_order, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL, repair_rounds=args.repair_rounds):
+                    logger.error("Parallel polish failed. Stopping.")
+                    sys.exit(1)
+            else:
+                for phase in POLISH_PHASES:
+                    if not process_polish(phase, REPO_URL, state, no_verify=SKIP_VERIFICATION, model=AGENT_MODEL, repair_rounds=args.repair_rounds):
+                        logger.error(f"Polish phase {phase} failed. Stopping.")
+                        sys.exit(1)
+            
+            logger.info("All polish phases completed successfully!")
+        run_status = "completed"
+
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+    finally:
+        history.finish_run(run_status)
+        if args.trace:
+            tracing.export_chrome_trace(args.trace)
+        if args.metrics:
+            tracing.export_prometheus(args.metrics)
+        log_pipeline.stop()
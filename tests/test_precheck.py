@@ -0,0 +1,61 @@
+"""Verdict tiers of the local branch checks and the referenced-path extraction they rely on."""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.precheck import decide, path_present
+from src.spec_index import PATH_PATTERN, parse_feature
+
+def make_checks(done=3, total=3, missing=(), expected=2, files=4):
+    return {
+        "branch": "cursor/agent", "base": "main",
+        "tasks": {"total": total, "done": done, "pending": [f"T{i:03d}" for i in range(done + 1, total + 1)]},
+        "paths": {"expected": expected, "missing": list(missing)},
+        "diff": {"files": files, "insertions": 40, "deletions": 2},
+    }
+
+class DecideTest(unittest.TestCase):
+    def test_pass_when_everything_is_done(self):
+        status, feedback = decide(make_checks())
+        self.assertEqual(status, "pass")
+        self.assertIn("All 3 tasks", feedback)
+
+    def test_fail_without_changes_outside_specs(self):
+        self.assertEqual(decide(make_checks(files=0))[0], "fail")
+
+    def test_fail_with_too_few_tasks_done(self):
+        status, feedback = decide(make_checks(done=1, total=4))
+        self.assertEqual(status, "fail")
+        self.assertIn("T002, T003, T004", feedback)
+
+    def test_defer_on_pending_tasks_or_missing_paths(self):
+        self.assertIsNone(decide(make_checks(done=3, total=4)))
+        self.assertIsNone(decide(make_checks(missing=["src/app.py"])))
+
+    def test_defer_without_path_checks(self):
+        checks = make_checks()
+        checks["paths"] = None
+        self.assertIsNone(decide(checks))
+
+class ReferencedPathTest(unittest.TestCase):
+    def test_prose_is_not_a_path(self):
+        text = "Create Next.js 14+ project, edit `config.py`, src/app/main.ts and node.js docs at https://example.com/a.html"
+        self.assertEqual(PATH_PATTERN.findall(text), ["config.py", "src/app/main.ts"])
+
+    def test_real_specs_reference_only_paths(self):
+        for feature in sorted(os.listdir(os.path.join(ROOT, "specs"))):
+            with self.subTest(feature=feature):
+                paths = parse_feature(os.path.join(ROOT, "specs", feature))["paths"]
+                self.assertTrue(paths)
+                self.assertTrue(all("/" in p for p in paths), paths)
+
+    def test_path_present_matches_suffix(self):
+        files = ["app/components/Board.tsx", "README.md"]
+        self.assertTrue(path_present("components/Board.tsx", files))
+        self.assertFalse(path_present("Board.ts", files))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""Section ranking and budget trimming of feature prompts, on the real specs in specs/."""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.prompt_budget import build_context, section_rank
+
+FEATURE_DIR = os.path.join(ROOT, "specs", "001-user-filtering")
+SCENARIOS = "User Scenarios & Testing *(mandatory)*"
+
+def statuses(report):
+    return {row["section"]: row["status"] for row in report if row["file"] != "tasks.md"}
+
+class SectionRankTest(unittest.TestCase):
+    def test_acceptance_sections_rank_first(self):
+        for heading in (SCENARIOS, "Requirements *(mandatory)*", "Success Criteria *(mandatory)*", "Acceptance Scenarios"):
+            with self.subTest(heading=heading):
+                self.assertEqual(section_rank("spec.md", heading), 1)
+
+    def test_other_sections_rank_after(self):
+        self.assertGreater(section_rank("spec.md", "Assumptions"), 1)
+        self.assertGreater(section_rank("plan.md", "Constitution Check"), 1)
+
+class BuildContextTest(unittest.TestCase):
+    def test_tight_budget_keeps_user_scenarios(self):
+        full = build_context(FEATURE_DIR, budget=10 ** 6)[1]
+        tasks = sum(row["tokens"] for row in full if row["file"] == "tasks.md")
+        scenarios = next(row["tokens"] for row in full if row["section"] == SCENARIOS)
+
+        context, report = build_context(FEATURE_DIR, budget=tasks + scenarios)
+        kept = statuses(report)
+        self.assertTrue(kept[SCENARIOS].startswith("kept"))
+        self.assertEqual(kept["Assumptions"], "omitted")
+        self.assertEqual(kept["Constitution Check"], "omitted")
+        self.assertIn("Acceptance Scenarios", context)
+        self.assertIn("spec.md / Assumptions", context)
+
+    def test_tasks_are_always_kept(self):
+        report = build_context(FEATURE_DIR, budget=1)[1]
+        self.assertTrue(all(row["status"].startswith("kept") for row in report if row["file"] == "tasks.md"))
+        self.assertTrue(all(row["status"] == "omitted" for row in report if row["file"] != "tasks.md"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Dependency ordering and rebuild planning over a synthetic specs/ tree."""
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import spec_index
+from src.prompts import feature_input_hash
+from src.scheduler import build_dependency_graph, invalidate_features, list_features, plan_rebuild, topological_order
+from src.state_manager import default_state
+
+# a <- b <- d, a <- c, e standalone
+DEPENDS_ON = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"], "e": []}
+
+def write_feature(specs_root, name, depends_on, body="Initial spec."):
+    feature_dir = os.path.join(specs_root, name)
+    os.makedirs(feature_dir, exist_ok=True)
+    front_matter = f"---\ndepends_on: [{', '.join(depends_on)}]\n---\n" if depends_on else ""
+    files = {
+        "spec.md": f"# Feature {name}\n\n{body}\n",
+        "plan.md": f"{front_matter}# Plan {name}\n",
+        "tasks.md": f"## Phase 1: Setup\n\n- [ ] T001 Create `src/{name}.py`\n",
+    }
+    for filename, content in files.items():
+        with open(os.path.join(feature_dir, filename), 'w') as f:
+            f.write(content)
+
+class TopologicalOrderTest(unittest.TestCase):
+    def test_dependencies_come_first_with_ties_by_name(self):
+        self.assertEqual(topological_order(DEPENDS_ON), ["a", "e", "b", "c", "d"])
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "cycle.*a, b"):
+            topological_order({"a": ["b"], "b": ["a"], "c": []})
+
+class RebuildPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        spec_index.disable_persistence()
+        self.specs_root = os.path.join(self.tmp.name, "specs")
+        for name, depends_on in DEPENDS_ON.items():
+            write_feature(self.specs_root, name, depends_on)
+        self.deps = build_dependency_graph(self.specs_root, list_features(self.specs_root))
+        self.state = default_state()
+        for name in DEPENDS_ON:
+            self.state["features"][name] = {
+                "status": "completed", "agent_id": f"agent-{name}", "branch": f"cursor/{name}",
+                "input_hash": feature_input_hash(os.path.join(self.specs_root, name)),
+            }
+        self.state["current_phase"] = "polish"
+        self.state["polish"] = {phase: {"status": "completed"} for phase in self.state["polish"]}
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_graph_reads_front_matter(self):
+        self.assertEqual(self.deps, DEPENDS_ON)
+
+    def test_unknown_dependency_is_rejected(self):
+        write_feature(self.specs_root, "f", ["missing"])
+        with self.assertRaisesRegex(ValueError, "unknown feature: missing"):
+            build_dependency_graph(self.specs_root, list_features(self.specs_root))
+
+    def test_unchanged_features_are_reused(self):
+        plan = plan_rebuild(self.deps, self.state, self.specs_root)
+        self.assertEqual(plan, dict.fromkeys(["a", "e", "b", "c", "d"]))
+        self.assertEqual(invalidate_features(self.state, plan), [])
+        self.assertEqual(self.state["current_phase"], "polish")
+
+    def test_edit_invalidates_feature_and_dependents(self):
+        write_feature(self.specs_root, "b", DEPENDS_ON["b"], body="Edited spec with a new requirement.")
+        plan = plan_rebuild(self.deps, self.state, self.specs_root)
+        self.assertEqual(plan, {"a": None, "e": None, "b": "changed", "c": None, "d": "dependent of b"})
+
+        self.assertEqual(invalidate_features(self.state, plan), ["b", "d"])
+        self.assertEqual(self.state["features"]["b"], {
+            "status": "stale", "reason": "changed", "previous_agent_id": "agent-b", "previous_branch": "cursor/b",
+        })
+        self.assertEqual(self.state["features"]["a"]["status"], "completed")
+        self.assertEqual(self.state["current_phase"], "features")
+        self.assertTrue(all(p == {"status": "pending"} for p in self.state["polish"].values()))
+
+    def test_task_progress_marks_are_not_edits(self):
+        path = os.path.join(self.specs_root, "a", "tasks.md")
+        with open(path) as f:
+            content = f.read()
+        with open(path, 'w') as f:
+            f.write(content.replace("- [ ]", "- [X]"))
+        self.assertTrue(all(reason is None for reason in plan_rebuild(self.deps, self.state, self.specs_root).values()))
+
+    def test_pending_feature_does_not_invalidate_dependents(self):
+        self.state["features"]["a"] = {"status": "failed"}
+        plan = plan_rebuild(self.deps, self.state, self.specs_root)
+        self.assertEqual(plan["a"], "pending")
+        self.assertIsNone(plan["b"])
+        self.assertEqual(invalidate_features(self.state, plan), [])
+
+    def test_entries_without_input_hash_are_reused(self):
+        del self.state["features"]["c"]["input_hash"]
+        write_feature(self.specs_root, "c", DEPENDS_ON["c"], body="Edited before input hashing existed.")
+        self.assertIsNone(plan_rebuild(self.deps, self.state, self.specs_root)["c"])
+
+if __name__ == "__main__":
+    unittest.main()
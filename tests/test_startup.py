@@ -0,0 +1,61 @@
+"""
+Startup regression tests for the commands that must return without the run modules.
+
+The import checks are exact. The time check compares the best of a few runs against a bare
+interpreter start with a generous margin, so it only trips when a heavy import slips back in.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from bench_orchestrator import MAIN_PATH, create_workspace
+from bench_startup import COMMANDS, EXPECTED_EXIT, best_time, free_port, imported_modules
+
+# Milliseconds over a bare interpreter start; well above the benchmark budgets to stay stable on loaded machines
+STARTUP_THRESHOLD = 500
+REPEAT = 3
+
+class StartupTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.root = cls.tmp.name
+        create_workspace(cls.root, 10, 4)
+        cls.env = {k: v for k, v in os.environ.items() if k not in ("GITHUB_REPO_URL", "CURSOR_API_KEY", "OPENAI_API_KEY")}
+        cls.env["ORCHESTRATOR_DAEMON_PORT"] = str(free_port())
+        cls.env["ORCHESTRATOR_HISTORY_DB"] = os.path.join(cls.root, "history.db")
+        cls.interpreter, _ = best_time([sys.executable, "-c", "pass"], cls.root, cls.env, REPEAT)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_no_forbidden_imports(self):
+        for command, _, forbidden in COMMANDS:
+            with self.subTest(command=" ".join(command)):
+                loaded = set(forbidden) & imported_modules([sys.executable, MAIN_PATH] + command, self.root, self.env)
+                self.assertFalse(loaded, f"imports {', '.join(sorted(loaded))}")
+
+    def test_startup_time(self):
+        for command, _, _ in COMMANDS:
+            with self.subTest(command=" ".join(command)):
+                total, exit_code = best_time([sys.executable, MAIN_PATH] + command, self.root, self.env, REPEAT)
+                self.assertEqual(exit_code, EXPECTED_EXIT.get(command[0], 0))
+                self.assertLess(total - self.interpreter, STARTUP_THRESHOLD)
+
+    def test_previews_are_read_only(self):
+        with tempfile.TemporaryDirectory() as root:
+            create_workspace(root, 3, 2)
+            before = set(os.listdir(root))
+            for command in (["--dry-run"], ["--plan"]):
+                best_time([sys.executable, MAIN_PATH] + command, root, self.env, 1)
+            self.assertEqual(set(os.listdir(root)), before)
+
+if __name__ == "__main__":
+    unittest.main()
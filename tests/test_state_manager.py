@@ -0,0 +1,106 @@
+"""Journal replay, torn-tail recovery and compaction of the orchestrator state, in a scratch directory."""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import state_manager
+from src.state_manager import (
+    JOURNAL_FILE, STATE_FILE, compact_journal, default_state, load_state, read_persisted_state,
+    read_state_snapshot, save_state,
+)
+
+class StateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        state_manager.persisted_state = {}
+        state_manager.journal_entries = 0
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def save_features(self, count):
+        state = default_state()
+        for i in range(count):
+            state["features"][f"00{i}-feature"] = {"status": "completed", "agent_id": f"agent-{i}"}
+            save_state(state)
+        return state
+
+class JournalRecoveryTest(StateTestCase):
+    def test_replay_restores_saved_state(self):
+        state = self.save_features(3)
+        self.assertEqual(load_state(), state)
+        self.assertEqual(state_manager.journal_entries, 3)
+
+    def test_torn_tail_is_discarded_and_truncated(self):
+        state = self.save_features(2)
+        size = os.path.getsize(JOURNAL_FILE)
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write('{"ts": 1, "ops": [{"op": "set", "path": ["features", "002-feat')  # process died mid-append
+
+        with self.assertLogs("orchestrator", "WARNING"):
+            recovered, entries = read_persisted_state()
+        self.assertEqual(recovered, state)
+        self.assertEqual(entries, 2)
+        self.assertEqual(os.path.getsize(JOURNAL_FILE), size)
+
+    def test_complete_line_without_newline_is_torn(self):
+        self.save_features(1)
+        entry = {"ts": 1, "ops": [{"op": "set", "path": ["current_phase"], "value": "polish"}]}
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write(json.dumps(entry))
+
+        with self.assertLogs("orchestrator", "WARNING"):
+            recovered, _ = read_persisted_state()
+        self.assertEqual(recovered["current_phase"], "features")
+
+    def test_snapshot_reader_skips_torn_tail_without_repairing(self):
+        state = self.save_features(2)
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write('{"ts": 1, "ops"')
+        size = os.path.getsize(JOURNAL_FILE)
+
+        self.assertEqual(read_state_snapshot(), state)
+        self.assertEqual(os.path.getsize(JOURNAL_FILE), size)
+
+class CompactionTest(StateTestCase):
+    def test_compaction_folds_journal_into_snapshot(self):
+        state = self.save_features(3)
+        compact_journal()
+
+        self.assertEqual(os.path.getsize(JOURNAL_FILE), 0)
+        with open(STATE_FILE) as f:
+            self.assertEqual(json.load(f), state)
+        self.assertEqual(read_state_snapshot(), state)
+        self.assertEqual(load_state(), state)
+
+    def test_saves_after_compaction_replay_over_snapshot(self):
+        state = self.save_features(2)
+        compact_journal()
+        state["current_phase"] = "polish"
+        save_state(state)
+
+        self.assertEqual(read_state_snapshot(), state)
+        self.assertEqual(read_persisted_state(), (state, 1))
+
+    def test_replay_over_uncompacted_snapshot_is_idempotent(self):
+        state = self.save_features(2)
+        with open(STATE_FILE, 'w') as f:
+            json.dump(state, f)  # crash between the snapshot rename and the journal truncation
+        self.assertEqual(read_persisted_state()[0], state)
+
+    def test_compacts_every_n_entries(self):
+        self.save_features(state_manager.JOURNAL_COMPACT_EVERY)
+        self.assertTrue(os.path.exists(STATE_FILE))
+        self.assertEqual(os.path.getsize(JOURNAL_FILE), 0)
+        self.assertEqual(state_manager.journal_entries, 0)
+
+if __name__ == "__main__":
+    unittest.main()